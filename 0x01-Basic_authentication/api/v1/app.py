@@ -4,15 +4,79 @@ Route module for the API
 """
 from os import getenv
 from api.v1.views import app_views
-from flask import Flask, jsonify, abort, request
+from api.v1.auth.path_matcher import PathMatcher
+from api.v1 import profiling
+from flask import Flask, jsonify, abort, request, g
 from flask_cors import (CORS, cross_origin)
+from models.base import FLUSHER
+from models import metrics
+from time import perf_counter
+import atexit
 import os
 
 
 app = Flask(__name__)
 app.register_blueprint(app_views)
+profiling.install(app)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 
+auth = None
+AUTH_TYPE = getenv("AUTH_TYPE")
+if AUTH_TYPE == "basic_auth":
+    from api.v1.auth.basic_auth import BasicAuth
+    auth = BasicAuth()
+elif AUTH_TYPE == "auth":
+    from api.v1.auth.auth import Auth
+    auth = Auth()
+
+# Write-behind mode: persist the pending mutations before exiting
+atexit.register(FLUSHER.shutdown)
+
+# Compiled once: extra rules come from AUTH_EXCLUDED_PATHS (comma separated)
+EXCLUDED_PATHS = PathMatcher(
+    ['/api/v1/status/', '/api/v1/unauthorized/', '/api/v1/forbidden/'] +
+    [p for p in getenv("AUTH_EXCLUDED_PATHS", "").split(",") if p])
+
+
+if metrics.ENABLED:
+    @app.before_request
+    def start_timer() -> None:
+        """ Start timing the request
+        """
+        g.request_start = perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        """ Record the duration of the request by route (the URL rule, so
+        that IDs don't create new series)
+        """
+        start = g.get("request_start")
+        if start is not None:
+            rule = request.url_rule
+            metrics.REQUESTS.observe(
+                perf_counter() - start, request.method,
+                rule.rule if rule is not None else "unmatched",
+                response.status_code)
+        return response
+
+
+@app.before_request
+def before_request() -> str:
+    """ Filter each request through the authentication system
+    """
+    if auth is None:
+        return
+    if not auth.require_auth(request.path, EXCLUDED_PATHS):
+        metrics.AUTH_OUTCOMES.inc(AUTH_TYPE, "excluded")
+        return
+    if auth.authorization_header(request) is None:
+        metrics.AUTH_OUTCOMES.inc(AUTH_TYPE, "missing")
+        abort(401)
+    if auth.current_user(request) is None:
+        metrics.AUTH_OUTCOMES.inc(AUTH_TYPE, "denied")
+        abort(403)
+    metrics.AUTH_OUTCOMES.inc(AUTH_TYPE, "ok")
+
 
 @app.errorhandler(404)
 def not_found(error) -> str:
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 """ Module that contains the Auth class
 """
+from api.v1.auth.path_matcher import PathMatcher
 from flask import request
-from typing import List, TypeVar
+from typing import List, TypeVar, Union
 
 
 class Auth():
@@ -12,17 +13,24 @@ class Auth():
         """
         pass
 
-    def require_auth(self, path: str, exclude_paths: List[str]) -> bool:
+    def require_auth(self, path: str,
+                     exclude_paths: Union[List[str], PathMatcher]) -> bool:
         """ Method that returns True if the path is not in the list of strings
 
         Args:
             path (str): The path to evaluate
-            exclude_paths (List[str]): The list of strings
+            exclude_paths (Union[List[str], PathMatcher]): The list of
+                strings (`*` allowed at the end), or a PathMatcher compiled
+                once from it
 
         Returns:
             bool: True if the path is not in the list of strings
         """
-        return False
+        if path is None or not exclude_paths:
+            return True
+        if not isinstance(exclude_paths, PathMatcher):
+            exclude_paths = PathMatcher(exclude_paths)
+        return not exclude_paths.match(path)
 
     def authorization_header(self, request=None) -> str:
         """ Method that returns the value of the Authorization header
@@ -34,7 +42,9 @@ class Auth():
         Returns:
             str: The value of the Authorization header in the request
         """
-        return None
+        if request is None:
+            return None
+        return request.headers.get("Authorization")
 
     def current_user(self, request=None) -> TypeVar('User'):
         """ Method that returns None
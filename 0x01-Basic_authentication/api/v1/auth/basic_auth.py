@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+""" Module that contains the BasicAuth class
+"""
+from api.v1.auth.auth import Auth
+from api.v1.auth.credential_cache import CredentialCache
+from models.user import User
+from os import getenv
+from typing import Tuple, TypeVar
+import base64
+import binascii
+import weakref
+
+
+CACHES = weakref.WeakSet()
+
+
+def _invalidate(user: User) -> None:
+    """ Drop the cached credentials of a saved or removed user from the
+    caches of all the BasicAuth instances alive
+    """
+    for cache in list(CACHES):
+        cache.invalidate_user(user.id)
+
+
+User.on_change(_invalidate)
+
+
+class BasicAuth(Auth):
+    """ Class that implements the Basic authentication
+    """
+    def __init__(self) -> None:
+        """ Constructor method: the credential cache is configured with
+        AUTH_CACHE_SIZE (0 disables it) and AUTH_CACHE_TTL (seconds)
+        """
+        super().__init__()
+        self.cache = CredentialCache(
+            max_size=int(getenv("AUTH_CACHE_SIZE", "1024")),
+            ttl=float(getenv("AUTH_CACHE_TTL", "60")))
+        CACHES.add(self.cache)
+
+    def extract_base64_authorization_header(
+            self, authorization_header: str) -> str:
+        """ Method that returns the Base64 part of the Authorization header
+
+        Args:
+            authorization_header (str): The Authorization header
+
+        Returns:
+            str: The Base64 part or None if the header is not Basic
+        """
+        if type(authorization_header) is not str:
+            return None
+        if not authorization_header.startswith("Basic "):
+            return None
+        return authorization_header[len("Basic "):]
+
+    def decode_base64_authorization_header(
+            self, base64_authorization_header: str) -> str:
+        """ Method that decodes the Base64 part of the Authorization header
+
+        Args:
+            base64_authorization_header (str): The Base64 string
+
+        Returns:
+            str: The decoded value or None if it is not valid Base64
+        """
+        if type(base64_authorization_header) is not str:
+            return None
+        try:
+            decoded = base64.b64decode(base64_authorization_header,
+                                       validate=True)
+            return decoded.decode("utf-8")
+        except (binascii.Error, UnicodeDecodeError):
+            return None
+
+    def extract_user_credentials(
+            self, decoded_base64_authorization_header: str) -> Tuple[str, str]:
+        """ Method that returns the user email and password
+
+        Args:
+            decoded_base64_authorization_header (str): "<email>:<password>"
+
+        Returns:
+            Tuple[str, str]: The email and the password, or (None, None)
+        """
+        if type(decoded_base64_authorization_header) is not str:
+            return None, None
+        if ":" not in decoded_base64_authorization_header:
+            return None, None
+        email, pwd = decoded_base64_authorization_header.split(":", 1)
+        return email, pwd
+
+    def user_object_from_credentials(
+            self, user_email: str, user_pwd: str) -> TypeVar('User'):
+        """ Method that returns the User matching the credentials
+
+        Args:
+            user_email (str): The email of the user
+            user_pwd (str): The password of the user
+
+        Returns:
+            TypeVar('User'): The User or None
+        """
+        if type(user_email) is not str or type(user_pwd) is not str:
+            return None
+        try:
+            users = User.search({"email": user_email})
+        except Exception:
+            return None
+        for user in users:
+            if user.is_valid_password(user_pwd):
+                return user
+        return None
+
+    def current_user(self, request=None) -> TypeVar('User'):
+        """ Method that returns the User authenticated by the request,
+        served from the credential cache when the header was already verified
+
+        Args:
+            request ([type], optional): The request. Defaults to None.
+
+        Returns:
+            TypeVar('User'): The User or None
+        """
+        header = self.authorization_header(request)
+        user_id = self.cache.get(header)
+        if user_id is not None:
+            user = User.get(user_id)
+            if user is not None:
+                return user
+        version = self.cache.version
+        b64 = self.extract_base64_authorization_header(header)
+        decoded = self.decode_base64_authorization_header(b64)
+        email, pwd = self.extract_user_credentials(decoded)
+        user = self.user_object_from_credentials(email, pwd)
+        if user is not None:
+            self.cache.put(header, user.id, version)
+        return user
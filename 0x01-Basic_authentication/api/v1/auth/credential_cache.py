@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+""" Module that contains the CredentialCache class
+"""
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+import hashlib
+import hmac
+import os
+
+
+class CredentialCache():
+    """ Bounded cache of verified Authorization headers
+
+    Maps a keyed digest of the header (the raw credentials are never kept)
+    to the id of the authenticated user. Entries expire after `ttl` seconds
+    and the least recently used one is evicted when the cache is full.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60) -> None:
+        """ Constructor method
+
+        Args:
+            max_size (int): Maximum number of entries, 0 disables the cache
+            ttl (float): Lifetime of an entry in seconds
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._secret = os.urandom(32)
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = Lock()
+        self._version = 0
+
+    def _key(self, header: str) -> bytes:
+        """ Keyed digest of an Authorization header
+        """
+        return hmac.new(self._secret, header.encode("utf-8"),
+                        hashlib.sha256).digest()
+
+    def get(self, header: str) -> str:
+        """ Method that returns the user id cached for the header
+
+        Args:
+            header (str): The Authorization header
+
+        Returns:
+            str: The user id or None if the header is not cached
+        """
+        if header is None or self.max_size <= 0:
+            return None
+        key = self._key(header)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    @property
+    def version(self) -> int:
+        """ Counter incremented by each invalidation: a header verified
+        against the users read at one version is only cached if no user
+        changed since
+        """
+        return self._version
+
+    def put(self, header: str, user_id: str, version: int = None) -> None:
+        """ Method that caches the user id of a verified header
+
+        Args:
+            header (str): The Authorization header
+            user_id (str): The id of the authenticated user
+            version (int): `version` read before verifying the header;
+                nothing is cached if an invalidation happened since
+        """
+        if header is None or user_id is None or self.max_size <= 0:
+            return
+        key = self._key(header)
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+            self._drop(key)
+            self._entries[key] = (user_id, monotonic() + self.ttl)
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: str) -> None:
+        """ Method that drops all the entries of a user
+
+        Args:
+            user_id (str): The id of the user
+        """
+        with self._lock:
+            self._version += 1
+            for key in self._keys_by_user.pop(user_id, set()):
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """ Method that drops all the entries
+        """
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self) -> dict:
+        """ Method that returns the size and hit/miss counters of the cache
+        """
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits,
+                    "misses": self.misses}
+
+    def _drop(self, key: bytes) -> None:
+        """ Remove one entry, the lock must be held
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry[0])
+        if keys is not None:
+            keys.discard(key)
+            if len(keys) == 0:
+                del self._keys_by_user[entry[0]]
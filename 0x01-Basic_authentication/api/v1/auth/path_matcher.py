@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+""" Module that contains the PathMatcher class
+"""
+from typing import Iterable
+
+
+_END = ""
+
+
+class PathMatcher():
+    """ Set of excluded paths compiled once: exact paths are kept in a set
+    and paths ending with `*` in a prefix trie, so a match costs
+    O(len(path)) whatever the number of rules.
+
+    Paths are slash tolerant: `/api/v1/status` and `/api/v1/status/` are
+    the same path.
+    """
+    def __init__(self, paths: Iterable[str] = ()) -> None:
+        """ Constructor method
+
+        Args:
+            paths (Iterable[str]): The excluded paths, `*` allowed at the end
+        """
+        self._exact = set()
+        self._prefixes = {}
+        self._size = 0
+        for path in paths:
+            self.add(path)
+
+    @staticmethod
+    def normalize(path: str) -> str:
+        """ Method that returns the path with exactly one trailing slash
+        """
+        return path.rstrip("/") + "/"
+
+    def add(self, path: str) -> None:
+        """ Method that adds one excluded path
+
+        Args:
+            path (str): The path, `*` allowed at the end
+        """
+        if path is None:
+            return
+        self._size += 1
+        if not path.endswith("*"):
+            self._exact.add(self.normalize(path))
+            return
+        node = self._prefixes
+        for char in path[:-1]:
+            node = node.setdefault(char, {})
+        node[_END] = True
+
+    def match(self, path: str) -> bool:
+        """ Method that returns True if the path is excluded
+
+        Args:
+            path (str): The path to evaluate
+
+        Returns:
+            bool: True if the path matches one of the excluded paths
+        """
+        if path is None:
+            return False
+        path = self.normalize(path)
+        if path in self._exact:
+            return True
+        node = self._prefixes
+        for char in path:
+            if _END in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return _END in node
+
+    def __len__(self) -> int:
+        """ Number of excluded paths added
+        """
+        return self._size
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+""" Profiling module: opt-in profiling of sampled requests
+
+Configured by environment variables:
+- PROFILE_SAMPLE_RATE: fraction of the requests profiled (default 0)
+- PROFILE_TOKEN: a request carrying the header `X-Profile: <token>` is
+  profiled whatever the sample rate
+- PROFILE_FORMAT: `pstats` (cProfile, default) or `collapsed` (stacks
+  sampled every PROFILE_INTERVAL seconds, one `frame;frame;... count` line
+  per stack, the input of flamegraph.pl / speedscope)
+- PROFILE_DIR: directory of the output files (default `profiles`)
+
+Nothing is installed when neither PROFILE_SAMPLE_RATE nor PROFILE_TOKEN is
+set.
+"""
+from flask import Flask, g, request
+from os import getenv, makedirs, path
+from threading import Event, Thread, get_ident
+from typing import Dict
+import cProfile
+import hmac
+import random
+import re
+import sys
+import time
+import uuid
+
+
+SAMPLE_RATE = float(getenv("PROFILE_SAMPLE_RATE", "0"))
+TOKEN = getenv("PROFILE_TOKEN")
+FORMAT = getenv("PROFILE_FORMAT", "pstats")
+INTERVAL = float(getenv("PROFILE_INTERVAL", "0.001"))
+DIR = getenv("PROFILE_DIR", "profiles")
+HEADER = "X-Profile"
+
+
+class StackSampler():
+    """ Sample the stack of one thread from a background thread and count
+    each distinct stack
+    """
+
+    def __init__(self, thread_id: int, interval: float = INTERVAL):
+        """ Initialize a StackSampler of the thread `thread_id`
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self._stop = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """ Start sampling
+        """
+        self._thread.start()
+
+    def stop(self) -> Dict[str, int]:
+        """ Stop sampling and return the count of each collapsed stack
+        """
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        """ Sampling thread
+        """
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append("{}:{}".format(
+                    path.basename(code.co_filename), code.co_name))
+                frame = frame.f_back
+            if frames:
+                stack = ";".join(reversed(frames))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+
+def _sampled() -> bool:
+    """ True if the current request must be profiled
+    """
+    if TOKEN and hmac.compare_digest(request.headers.get(HEADER, ""),
+                                     TOKEN):
+        return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def _file_path(extension: str) -> str:
+    """ Unique output file of the current request
+    """
+    name = re.sub(r"[^A-Za-z0-9]+", "_", request.path).strip("_") or "root"
+    return path.join(DIR, "{}-{}-{}-{}.{}".format(
+        time.strftime("%Y%m%dT%H%M%S"), request.method, name,
+        uuid.uuid4().hex[:8], extension))
+
+
+def install(app: Flask):
+    """ Register the profiling hooks on `app` when profiling is enabled;
+    they run first and last, around the other hooks
+    """
+    if SAMPLE_RATE <= 0 and not TOKEN:
+        return
+
+    def start_profile() -> None:
+        """ Start profiling a sampled request
+        """
+        if not _sampled():
+            return
+        if FORMAT == "collapsed":
+            g.profiler = StackSampler(get_ident())
+            g.profiler.start()
+        else:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    def write_profile(response):
+        """ Stop profiling and write the output file, named in the
+        X-Profile-File header
+        """
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+        makedirs(DIR, exist_ok=True)
+        if isinstance(profiler, StackSampler):
+            stacks = profiler.stop()
+            file_path = _file_path("collapsed")
+            with open(file_path, "w") as f:
+                for stack, count in stacks.items():
+                    f.write("{} {}\n".format(stack, count))
+        else:
+            profiler.disable()
+            file_path = _file_path("prof")
+            profiler.dump_stats(file_path)
+        response.headers["X-Profile-File"] = file_path
+        return response
+
+    app.before_request_funcs.setdefault(None, []).insert(0, start_profile)
+    app.after_request(write_profile)
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """ Module of Index views
 """
-from flask import jsonify, abort
+from flask import Response, jsonify, abort
 from api.v1.views import app_views
 
 
@@ -19,13 +19,31 @@ def stats() -> str:
     """ GET /api/v1/stats
     Return:
       - the number of each objects
+      - the write-behind flusher stats, in write-behind mode
     """
+    from models.base import FLUSHER
     from models.user import User
     stats = {}
     stats['users'] = User.count()
+    if User._write_behind:
+        stats['flush'] = FLUSHER.stats()
     return jsonify(stats)
 
 
+@app_views.route('/metrics', strict_slashes=False)
+def metrics() -> str:
+    """ GET /api/v1/metrics
+    Return:
+      - the metrics in the Prometheus text exposition format
+      - 404 if metrics are disabled (METRICS_ENABLED)
+    """
+    from models.metrics import ENABLED, REGISTRY
+    if not ENABLED:
+        abort(404)
+    return Response(REGISTRY.render(),
+                    mimetype="text/plain; version=0.0.4")
+
+
 @app_views.route('/unauthorized', strict_slashes=False)
 def unauthorized() -> str:
     """ GET /api/v1/unauthorized
@@ -2,18 +2,119 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request
 from models.user import User
+from typing import Iterator, List
+import json
+
+
+def _iter_users(after: str = None) -> Iterator[User]:
+    """ Users in ID order, starting after the user ID `after` (a user
+    removed since is simply skipped)
+    """
+    for user_id in User.ids_after(after):
+        user = User.get(user_id)
+        if user is not None:
+            yield user
+
+
+def _project(user: User, fields: List[str] = None) -> dict:
+    """ JSON representation of a user, restricted to `fields`
+    """
+    user_json = user.to_json()
+    if fields is None:
+        return user_json
+    return {k: v for k, v in user_json.items() if k in fields}
+
+
+def _iter_lines(stream, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+    """ Lines of a request body, read by chunks
+    """
+    rest = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+
+def _ndjson(users: Iterator[User], fields: List[str] = None,
+            limit: int = None) -> Response:
+    """ Streamed response, one JSON user per line
+    """
+    def generate():
+        for i, user in enumerate(users):
+            if limit is not None and i >= limit:
+                break
+            yield json.dumps(_project(user, fields)) + "\n"
+    return Response(generate(), mimetype="application/x-ndjson")
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (all optional):
+      - limit: maximum number of users returned
+      - after: ID of the last user of the previous page (cursor)
+      - fields: comma separated attributes to return
+      - format: `ndjson` (one user per line) or `stream` (chunked JSON
+        list), both streamed without building the whole response
     Return:
       - list of all User objects JSON represented
+      - header X-Next-Cursor when more users may follow the page
+      - 400 if a parameter is not valid
+    """
+    limit = request.args.get("limit")
+    fields = request.args.get("fields")
+    fmt = request.args.get("format")
+    if fields is not None:
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+    if limit is not None:
+        if not limit.isdigit() or int(limit) <= 0:
+            return jsonify({'error': "Invalid limit"}), 400
+        limit = int(limit)
+    users = _iter_users(request.args.get("after"))
+
+    if fmt == "ndjson":
+        return _ndjson(users, fields, limit)
+    if fmt == "stream":
+        def generate():
+            yield "["
+            for i, user in enumerate(users):
+                if limit is not None and i >= limit:
+                    break
+                yield ("," if i else "") + json.dumps(_project(user, fields))
+            yield "]"
+        return Response(generate(), mimetype="application/json")
+
+    page = []
+    last_id = None
+    for user in users:
+        if limit is not None and len(page) >= limit:
+            break
+        page.append(_project(user, fields))
+        last_id = user.id
+    response = jsonify(page)
+    if limit is not None and len(page) == limit:
+        response.headers["X-Next-Cursor"] = last_id
+    return response
+
+
+@app_views.route('/users/export', methods=['GET'], strict_slashes=False)
+def export_users() -> str:
+    """ GET /api/v1/users/export
+    Return:
+      - all User objects JSON represented, one per line (NDJSON), streamed
+        as a file attachment; users are read one at a time, in ID order
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    response = _ndjson(_iter_users())
+    response.headers["Content-Disposition"] = \
+        "attachment; filename=users.ndjson"
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -89,6 +190,50 @@ def create_user() -> str:
     return jsonify({'error': error_msg}), 400
 
 
+@app_views.route('/users/bulk', methods=['POST'], strict_slashes=False)
+def create_users() -> str:
+    """ POST /api/v1/users/bulk
+    NDJSON body, one user per line:
+      - email
+      - password
+      - last_name (optional)
+      - first_name (optional)
+    Return:
+      - number of User objects created, all saved at once
+      - 400 with the errors by line number if a line is not valid: no User
+        is created
+    """
+    users = []
+    errors = []
+    for line_no, line in enumerate(_iter_lines(request.stream), 1):
+        if line.strip() == b"":
+            continue
+        try:
+            rj = json.loads(line)
+        except ValueError:
+            rj = None
+        if type(rj) is not dict:
+            errors.append({'line': line_no, 'error': "Wrong format"})
+        elif rj.get("email", "") == "":
+            errors.append({'line': line_no, 'error': "email missing"})
+        elif rj.get("password", "") == "":
+            errors.append({'line': line_no, 'error': "password missing"})
+        elif not errors:
+            user = User()
+            user.email = rj.get("email")
+            user.password = rj.get("password")
+            user.first_name = rj.get("first_name")
+            user.last_name = rj.get("last_name")
+            users.append(user)
+    if errors:
+        return jsonify({'errors': errors}), 400
+    try:
+        User.bulk_save(users)
+    except Exception as e:
+        return jsonify({'error': "Can't create User: {}".format(e)}), 400
+    return jsonify({'created': len(users)}), 201
+
+
 @app_views.route('/users/<user_id>', methods=['PUT'], strict_slashes=False)
 def update_user(user_id: str = None) -> str:
     """ PUT /api/v1/users/:id
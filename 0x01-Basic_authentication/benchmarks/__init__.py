@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+""" Benchmarks of the API
+
+Each module is runnable from the project root, e.g.:
+    $ python3 -m benchmarks.journal
+"""
+from contextlib import contextmanager
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, Dict, List
+import json
+import os
+import platform
+
+
+@contextmanager
+def isolated_cwd():
+    """ Run the block in a temporary working directory, so `.db_*` files
+    written by the models don't touch the real ones
+    """
+    previous = os.getcwd()
+    with TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            yield tmp_dir
+        finally:
+            os.chdir(previous)
+
+
+def measure(fn: Callable, n: int) -> List[float]:
+    """ Call `fn(i)` n times and return each latency in seconds
+    """
+    latencies = []
+    for i in range(n):
+        start = perf_counter()
+        fn(i)
+        latencies.append(perf_counter() - start)
+    return latencies
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """ Nearest-rank percentile of `values`
+    """
+    if len(values) == 0:
+        return 0.0
+    ordered = sorted(values)
+    rank = int(round(pct / 100 * len(ordered))) - 1
+    rank = max(0, min(len(ordered) - 1, rank))
+    return ordered[rank]
+
+
+def summary(latencies: List[float]) -> Dict[str, float]:
+    """ p50/p95/p99 latencies (ms) and throughput (ops/s)
+    """
+    total = sum(latencies)
+    return {
+        "n": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "ops_per_s": len(latencies) / total if total > 0 else 0.0,
+    }
+
+
+def write_report(results: List[dict], file_path: str = None) -> dict:
+    """ JSON report of benchmark results (dictionaries with `scenario`,
+    `users` and the `summary()` keys), written to `file_path` if given
+    """
+    report = {"python": platform.python_version(),
+              "platform": platform.platform(),
+              "results": results}
+    if file_path is not None:
+        with open(file_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def compare(results: List[dict], baseline_path: str,
+            tolerance: float = 0.2) -> List[str]:
+    """ Regressions of `results` against the report at `baseline_path`:
+    scenarios whose p95 latency grew by more than `tolerance` (ratio)
+    """
+    with open(baseline_path) as f:
+        baseline = {(r["scenario"], r["users"]): r
+                    for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        base = baseline.get((result["scenario"], result["users"]))
+        if base is None or base["p95_ms"] <= 0:
+            continue
+        ratio = result["p95_ms"] / base["p95_ms"]
+        if ratio > 1 + tolerance:
+            regressions.append("{} ({} users): p95 {:.3f} ms -> {:.3f} ms "
+                               "(x{:.2f})".format(
+                                   result["scenario"], result["users"],
+                                   base["p95_ms"], result["p95_ms"], ratio))
+    return regressions
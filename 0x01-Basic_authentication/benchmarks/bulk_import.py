@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+""" Import users through `POST /api/v1/users/bulk` (one request, one file
+rewrite) against one `POST /api/v1/users` per user, then export them
+through `GET /api/v1/users/export`
+
+    $ python3 -m benchmarks.bulk_import [users] [single users]
+"""
+from benchmarks import isolated_cwd
+from models.base import DATA, JOURNALS
+from models.user import User
+import json
+import sys
+import time
+
+
+def ndjson(n: int) -> bytes:
+    """ NDJSON body of `n` users
+    """
+    return "".join(json.dumps({"email": "u{}@example.com".format(i),
+                               "password": "pwd{}".format(i)}) + "\n"
+                   for i in range(n)).encode("utf-8")
+
+
+def bench(users: int, single: int) -> dict:
+    """ Import `users` in bulk, `single` one at a time, export them all
+    """
+    from api.v1 import app as app_module
+    app_module.auth = None
+    client = app_module.app.test_client()
+    result = {}
+    with isolated_cwd():
+        JOURNALS.pop("User", None)
+        DATA["User"] = {}
+        body = ndjson(users)
+        start = time.perf_counter()
+        response = client.post("/api/v1/users/bulk", data=body,
+                               content_type="application/x-ndjson")
+        result["bulk_s"] = time.perf_counter() - start
+        assert response.status_code == 201, response.get_json()
+        assert User.count() == users
+
+        start = time.perf_counter()
+        response = client.get("/api/v1/users/export")
+        lines = sum(1 for line in response.response if line.strip())
+        result["export_s"] = time.perf_counter() - start
+        assert lines == users
+
+        DATA["User"] = {}
+        start = time.perf_counter()
+        for i in range(single):
+            response = client.post("/api/v1/users", json={
+                "email": "s{}@example.com".format(i), "password": "pwd"})
+            assert response.status_code == 201
+        result["single_s"] = time.perf_counter() - start
+    return result
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    single = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    res = bench(users, single)
+    print("bulk import: {} users in {:.2f} s ({:.0f} users/s)".format(
+        users, res["bulk_s"], users / res["bulk_s"]))
+    print("     export: {} users in {:.2f} s ({:.0f} users/s)".format(
+        users, res["export_s"], users / res["export_s"]))
+    print("single POST: {} users in {:.2f} s ({:.0f} users/s)".format(
+        single, res["single_s"], single / res["single_s"]))
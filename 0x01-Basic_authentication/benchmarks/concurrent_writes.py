@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+""" Multi-threaded `User.save()`: throughput, number of file rewrites
+(group commit) and check that no update is lost on reload; then readers
+of a memory-mapped snapshot (`User.get`/`User.search`) running while
+writers compact it
+
+    $ python3 -m benchmarks.concurrent_writes [threads ...]
+"""
+from benchmarks import isolated_cwd
+from models.base import COMMITS, DATA, JOURNALS
+from models.serializers import SERIALIZERS
+from models.user import User
+from threading import Event, Thread
+import sys
+import time
+
+
+def bench(threads: int, journal: bool, per_thread: int = 200,
+          size: int = 1000) -> dict:
+    """ Save `per_thread` new users from each of `threads` threads in a
+    store already holding `size` users
+    """
+    with isolated_cwd():
+        User._journal = journal
+        JOURNALS.pop("User", None)
+        COMMITS.pop("User", None)
+        DATA["User"] = {}
+        for i in range(size):
+            user = User(email="u{}@example.com".format(i))
+            DATA["User"][user.id] = user
+        User.save_to_file()
+        ids = []
+
+        def worker(t: int):
+            for i in range(per_thread):
+                user = User(email="t{}-{}@example.com".format(t, i))
+                user.save()
+                ids.append(user.id)
+
+        workers = [Thread(target=worker, args=(t,)) for t in range(threads)]
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - start
+
+        User._get_journal().close()
+        JOURNALS.pop("User", None)
+        User.load_from_file()
+        missing = [i for i in ids if User.get(i) is None]
+        assert not missing, "{} lost updates".format(len(missing))
+        assert User.count() == size + threads * per_thread
+        committer = COMMITS.get("User")
+        User._get_journal().close()
+        return {
+            "writes_per_s": len(ids) / elapsed,
+            "commits": committer.commits if committer else 0,
+            "flushes": committer.flushes if committer else 0,
+        }
+
+
+def bench_mmap(threads: int, per_thread: int = 20,
+               size: int = 2000) -> dict:
+    """ `threads` readers get, search and scan the users of a memory-mapped
+    snapshot while one writer saves users and rewrites the snapshot after each
+    save; no read may fail
+    """
+    serializer, mmap = User._serializer, User._mmap
+    with isolated_cwd():
+        User._serializer, User._mmap = SERIALIZERS["binary"], True
+        JOURNALS.pop("User", None)
+        COMMITS.pop("User", None)
+        User._close_store()
+        DATA["User"] = {}
+        for i in range(size):
+            user = User(email="u{}@example.com".format(i))
+            DATA["User"][user.id] = user
+        User.save_to_file()
+        User.load_from_file()
+        ids = list(User.ids_after())
+        done = Event()
+        errors = []
+        reads = [0] * threads
+
+        def reader(t: int):
+            i = t
+            while not done.is_set():
+                try:
+                    User.get(ids[i % size])
+                    User.search({"email": "u{}@example.com".format(
+                        i % size)})
+                    if reads[t] % 50 == 0:
+                        # a full scan decodes from the store for long
+                        sum(1 for _ in User._iter_all())
+                except Exception as e:
+                    errors.append(repr(e))
+                    return
+                reads[t] += 1
+                i += threads
+
+        readers = [Thread(target=reader, args=(t,)) for t in range(threads)]
+        for r in readers:
+            r.start()
+        start = time.perf_counter()
+        for i in range(per_thread):
+            User(email="w{}@example.com".format(i)).save()
+            User.save_to_file()
+        elapsed = time.perf_counter() - start
+        done.set()
+        for r in readers:
+            r.join()
+        User._get_journal().close()
+        User._close_store()
+        User._serializer, User._mmap = serializer, mmap
+        assert not errors, errors[:3]
+        return {"compactions_per_s": per_thread / elapsed,
+                "reads_per_s": sum(reads) / elapsed}
+
+
+if __name__ == "__main__":
+    counts = [int(s) for s in sys.argv[1:]] or [1, 4, 16]
+    print("{:>8} {:>8} {:>10} {:>8} {:>8}".format(
+        "threads", "mode", "writes/s", "commits", "flushes"))
+    for threads in counts:
+        for journal in (False, True):
+            res = bench(threads, journal)
+            print("{:>8} {:>8} {:>10.0f} {:>8} {:>8}".format(
+                threads, "journal" if journal else "rewrite",
+                res["writes_per_s"], res["commits"], res["flushes"]))
+    print("{:>8} {:>14} {:>10}".format("readers", "compactions/s",
+                                       "reads/s"))
+    for threads in counts:
+        res = bench_mmap(threads)
+        print("{:>8} {:>14.1f} {:>10.0f}".format(
+            threads, res["compactions_per_s"], res["reads_per_s"]))
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+""" Write latency of `User.save()` against the number of users, with the
+full-file rewrite and with the append-only journal
+
+    $ python3 -m benchmarks.journal [size ...]
+"""
+from benchmarks import isolated_cwd, measure, summary
+from models.base import DATA, JOURNALS
+from models.user import User
+import sys
+
+
+def bench(size: int, journal: bool, n: int = 200) -> dict:
+    """ Save `n` new users in a store already holding `size` users
+    """
+    with isolated_cwd():
+        User._journal = journal
+        JOURNALS.pop("User", None)
+        DATA["User"] = {}
+        for i in range(size):
+            user = User(email="u{}@example.com".format(i))
+            DATA["User"][user.id] = user
+        User.save_to_file()
+
+        def save_one(i: int):
+            user = User(email="new{}@example.com".format(i))
+            user.password = "pwd"
+            user.save()
+
+        result = summary(measure(save_one, n))
+        User._get_journal().close()
+        return result
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [1000, 10000, 100000]
+    print("{:>8} {:>8} {:>10} {:>10}".format(
+        "users", "mode", "p50 ms", "p99 ms"))
+    for size in sizes:
+        for journal in (False, True):
+            res = bench(size, journal)
+            print("{:>8} {:>8} {:>10.3f} {:>10.3f}".format(
+                size, "journal" if journal else "rewrite",
+                res["p50_ms"], res["p99_ms"]))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+""" Memory per user and `to_json()` speed of the slotted `User` against an
+equivalent `__dict__` based object (previous representation)
+
+    $ python3 -m benchmarks.memory [users]
+"""
+from benchmarks import measure, summary
+from datetime import datetime
+from models.base import TIMESTAMP_FORMAT
+from models.user import User
+import sys
+import tracemalloc
+import uuid
+
+
+class DictUser():
+    """ Previous representation: attributes in a per-instance `__dict__`
+    """
+
+    def __init__(self, **kwargs):
+        """ Same attributes as User
+        """
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+        self.email = kwargs.get('email')
+        self._password = kwargs.get('_password')
+        self.first_name = kwargs.get('first_name')
+        self.last_name = kwargs.get('last_name')
+
+    def to_json(self, for_serialization: bool = False) -> dict:
+        """ Previous serializer
+        """
+        result = {}
+        for key, value in self.__dict__.items():
+            if not for_serialization and key[0] == '_':
+                continue
+            if type(value) is datetime:
+                result[key] = value.strftime(TIMESTAMP_FORMAT)
+            else:
+                result[key] = value
+        return result
+
+
+def bytes_per_object(cls, users: int) -> float:
+    """ Average memory allocated by one object of `cls`
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [cls(email="u{}@example.com".format(i), _password="x" * 64)
+            for i in range(users)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(objs)
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for cls in (DictUser, User):
+        objs = [cls(email="u{}@example.com".format(i)) for i in range(1000)]
+        res = summary(measure(lambda i: objs[i % 1000].to_json(True), users))
+        print("{:>8}: {:.0f} bytes/user, to_json {:.0f}/s".format(
+            cls.__name__, bytes_per_object(cls, users), res["ops_per_s"]))
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+""" Memory held after `User.load_from_file()` and `User.get()` latency,
+loading the binary snapshot in memory or memory-mapping it
+
+    $ python3 -m benchmarks.mmap_store [users]
+"""
+from benchmarks import isolated_cwd, measure, summary
+from models.base import DATA
+from models.serializers import SERIALIZERS
+from models.user import User
+import random
+import sys
+import tracemalloc
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with isolated_cwd():
+        User._serializer = SERIALIZERS["binary"]
+        DATA["User"] = {}
+        for i in range(users):
+            user = User(id="id-{}".format(i),
+                        email="u{}@example.com".format(i))
+            DATA["User"][user.id] = user
+        User.save_to_file()
+        DATA["User"] = {}
+        ids = ["id-{}".format(random.randrange(users)) for _ in range(10000)]
+        for mmap in (False, True):
+            User._mmap = mmap
+            tracemalloc.start()
+            User.load_from_file()
+            held = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            res = summary(measure(lambda i: User.get(ids[i]), len(ids)))
+            print("{:>9}: {:.1f} MB held, count {}, get p50 {:.4f} ms, "
+                  "p99 {:.4f} ms".format("mmap" if mmap else "in memory",
+                                         held / 1e6, User.count(),
+                                         res["p50_ms"], res["p99_ms"]))
+            User._close_store()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+""" Cost of `Auth.require_auth` with a compiled PathMatcher against a scan
+of the raw exclusion list
+
+    $ python3 -m benchmarks.path_matcher [rules]
+"""
+from api.v1.auth.auth import Auth
+from api.v1.auth.path_matcher import PathMatcher
+from benchmarks import measure, summary
+from typing import List
+import sys
+
+
+def naive_require_auth(path: str, exclude_paths: List[str]) -> bool:
+    """ Normalize and scan the list on every call
+    """
+    path = path.rstrip("/") + "/"
+    for excluded in exclude_paths:
+        if excluded.endswith("*"):
+            if path.startswith(excluded[:-1]):
+                return False
+        elif path == excluded.rstrip("/") + "/":
+            return False
+    return True
+
+
+def bench(rules: int, n: int = 20000) -> dict:
+    """ Evaluate `n` paths against `rules` exclusion rules
+    """
+    exclude_paths = []
+    for i in range(rules):
+        if i % 2:
+            exclude_paths.append("/api/v1/public/{}/*".format(i))
+        else:
+            exclude_paths.append("/api/v1/static/{}/".format(i))
+    paths = ["/api/v1/users/{}".format(i) for i in range(n)]
+    auth = Auth()
+    matcher = PathMatcher(exclude_paths)
+    return {
+        "naive": summary(measure(
+            lambda i: naive_require_auth(paths[i], exclude_paths), n)),
+        "compiled": summary(measure(
+            lambda i: auth.require_auth(paths[i], matcher), n)),
+    }
+
+
+if __name__ == "__main__":
+    rules = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for name, res in bench(rules).items():
+        print("{:>9}: {:>10.0f} checks/s, p99 {:.4f} ms".format(
+            name, res["ops_per_s"], res["p99_ms"]))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+""" Save/load time and file size of the models store formats, after
+checking the JSON reader at every chunk size
+
+    $ python3 -m benchmarks.serializers [users]
+"""
+from benchmarks import isolated_cwd
+from models.base import DATA
+from models.json_stream import iter_object_items
+from models.serializers import SERIALIZERS, convert
+from models.user import User
+from time import perf_counter
+import io
+import json
+import os
+import sys
+
+
+SAMPLE = ('{"a": 1.5, "b": -2e3, "c": {"d": 10, "e": [0.25, 1E-7]}, '
+          '"f": 12345, "g": "x", "h": true, "i": null}')
+
+
+def check_chunk_sizes() -> None:
+    """ The incremental JSON reader gives the same items whatever the
+    chunk size, values cut at the end of a chunk included
+    """
+    expected = list(json.loads(SAMPLE).items())
+    for chunk_size in range(1, len(SAMPLE) + 1):
+        assert list(iter_object_items(io.StringIO(SAMPLE), chunk_size)) == \
+            expected, chunk_size
+
+
+if __name__ == "__main__":
+    check_chunk_sizes()
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with isolated_cwd():
+        DATA["User"] = {}
+        for i in range(users):
+            user = User(email="u{}@example.com".format(i))
+            user.password = "pwd{}".format(i)
+            DATA["User"][user.id] = user
+        expected = {k: v.to_json(True) for k, v in DATA["User"].items()}
+        for name, serializer in SERIALIZERS.items():
+            User._serializer = serializer
+            start = perf_counter()
+            User.save_to_file()
+            save_s = perf_counter() - start
+            start = perf_counter()
+            for _ in serializer.load(User._file_path()):
+                pass
+            parse_s = perf_counter() - start
+            start = perf_counter()
+            User.load_from_file()
+            load_s = perf_counter() - start
+            assert {k: v.to_json(True)
+                    for k, v in DATA["User"].items()} == expected
+            print("{:>7}: save {:.3f} s, parse {:.3f} s, load {:.3f} s, "
+                  "{:.1f} MB".format(name, save_s, parse_s, load_s,
+                                     os.path.getsize(User._file_path()) / 1e6))
+        os.remove(".db_User.bin")
+        convert("User", "json", "binary")
+        User.load_from_file()
+        assert {k: v.to_json(True) for k, v in DATA["User"].items()} == \
+            expected
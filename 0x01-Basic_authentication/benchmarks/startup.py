@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+""" Cold start: time of `User.load_from_file()` against the number of
+users, with the previous loader (`json.load` + `strptime`), the streaming
+loader, and the streaming loader in lazy mode
+
+    $ python3 -m benchmarks.startup [users ...]
+"""
+from benchmarks import isolated_cwd
+from datetime import datetime
+from models.base import DATA, TIMESTAMP_FORMAT
+from models.user import User
+from time import perf_counter
+import json
+import sys
+
+
+def write_users(users: int) -> None:
+    """ Write a `.db_User.json` file holding `users` users
+    """
+    now = datetime.utcnow().strftime(TIMESTAMP_FORMAT)
+    with open(".db_User.json", "w") as f:
+        f.write("{")
+        for i in range(users):
+            obj_id = "id-{}".format(i)
+            f.write("{}{}: {}".format("," if i else "", json.dumps(obj_id),
+                                      json.dumps({
+                                          "id": obj_id, "created_at": now,
+                                          "updated_at": now,
+                                          "email": "u{}@ex.com".format(i),
+                                          "_password": "x" * 64,
+                                          "first_name": None,
+                                          "last_name": None})))
+        f.write("}")
+
+
+def previous_load() -> None:
+    """ Loader before the streaming one: whole file parsed at once and
+    timestamps parsed with strptime (on top of the objects' own parsing)
+    """
+    DATA["User"] = {}
+    with open(".db_User.json", 'r') as f:
+        for obj_id, obj_json in json.load(f).items():
+            for key in ("created_at", "updated_at"):
+                datetime.strptime(obj_json[key], TIMESTAMP_FORMAT)
+            DATA["User"][obj_id] = User(**obj_json)
+
+
+def timed(fn) -> float:
+    """ Seconds spent in `fn()`
+    """
+    start = perf_counter()
+    fn()
+    return perf_counter() - start
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [10000, 100000]
+    for users in sizes:
+        with isolated_cwd():
+            write_users(users)
+            results = {"previous": timed(previous_load)}
+            User._lazy_load = False
+            results["streaming"] = timed(User.load_from_file)
+            User._lazy_load = True
+            results["lazy"] = timed(User.load_from_file)
+            start = perf_counter()
+            User.get("id-{}".format(users // 2))
+            results["lazy get"] = perf_counter() - start
+            print("{:>8} users: {}".format(users, ", ".join(
+                "{} {:.3f} s".format(k, v) for k, v in results.items())))
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+""" Offline benchmark suite of the API: CRUD on `/api/v1/users` with Basic
+authentication, through the Flask test client, at several store sizes
+
+    $ python3 -m benchmarks.suite [--sizes 100,1000,10000] [-n 50]
+          [--output report.json] [--compare baseline.json]
+
+Prints p50/p95/p99 latency and throughput of each scenario, writes them
+as JSON with `--output`, and with `--compare` exits with status 1 when a
+p95 latency regressed by more than `--tolerance` against a previous
+report.
+"""
+from benchmarks import compare, isolated_cwd, measure, summary, write_report
+from models.base import COMMITS, DATA, JOURNALS
+from models.user import User
+from typing import List
+import argparse
+import base64
+import sys
+
+
+EMAIL = "admin@example.com"
+PASSWORD = "pwd"
+
+
+def bench(users: int, n: int) -> List[dict]:
+    """ Run each scenario `n` times on a store holding `users` users
+    """
+    from api.v1 import app as app_module
+    from api.v1.auth.basic_auth import BasicAuth
+
+    if not isinstance(app_module.auth, BasicAuth):
+        app_module.auth = BasicAuth()
+    app_module.auth.cache.clear()
+    client = app_module.app.test_client()
+    credentials = base64.b64encode("{}:{}".format(
+        EMAIL, PASSWORD).encode("utf-8")).decode("ascii")
+    headers = {"Authorization": "Basic {}".format(credentials)}
+    with isolated_cwd():
+        JOURNALS.pop("User", None)
+        COMMITS.pop("User", None)
+        DATA["User"] = {}
+        admin = User(email=EMAIL)
+        admin.password = PASSWORD
+        DATA["User"][admin.id] = admin
+        for i in range(users):
+            user = User(email="u{}@example.com".format(i))
+            DATA["User"][user.id] = user
+        User.save_to_file()
+        User.load_from_file()
+        ids = [None] * n
+
+        def check(response, status: int = 200):
+            assert response.status_code == status, response.status_code
+            return response
+
+        def create(i: int):
+            ids[i] = check(client.post("/api/v1/users", headers=headers, json={
+                "email": "new{}@example.com".format(i),
+                "password": PASSWORD}), 201).json["id"]
+
+        def get(i: int):
+            check(client.get("/api/v1/users/{}".format(ids[i]),
+                             headers=headers))
+
+        def list_page(i: int):
+            check(client.get("/api/v1/users?limit=100", headers=headers))
+
+        def update(i: int):
+            check(client.put("/api/v1/users/{}".format(ids[i]),
+                             headers=headers, json={"first_name": "F"}))
+
+        def delete(i: int):
+            check(client.delete("/api/v1/users/{}".format(ids[i]),
+                                headers=headers))
+
+        results = []
+        for scenario in (create, get, list_page, update, delete):
+            result = {"scenario": scenario.__name__, "users": users}
+            result.update(summary(measure(scenario, n)))
+            results.append(result)
+        User._get_journal().close()
+        return results
+
+
+def main(argv: List[str] = None) -> int:
+    """ Run the suite, print and save the report; 1 on regressions
+    """
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks.suite")
+    parser.add_argument("--sizes", default="100,1000,10000",
+                        help="comma separated numbers of users")
+    parser.add_argument("-n", type=int, default=50,
+                        help="requests per scenario")
+    parser.add_argument("--output", help="write the JSON report there")
+    parser.add_argument("--compare", help="JSON report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed p95 growth against --compare")
+    args = parser.parse_args(argv)
+
+    results = []
+    print("{:>10} {:>8} {:>9} {:>9} {:>9} {:>10}".format(
+        "scenario", "users", "p50 ms", "p95 ms", "p99 ms", "req/s"))
+    for users in (int(s) for s in args.sizes.split(",")):
+        for result in bench(users, args.n):
+            results.append(result)
+            print("{:>10} {:>8} {:>9.3f} {:>9.3f} {:>9.3f} {:>10.0f}".format(
+                result["scenario"], users, result["p50_ms"],
+                result["p95_ms"], result["p99_ms"], result["ops_per_s"]))
+    write_report(results, args.output)
+    if args.compare is not None:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print("regression: {}".format(regression))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+""" Latency of `User.save()` with the synchronous rewrite and with the
+write-behind flusher, and flush lag of the latter
+
+    $ python3 -m benchmarks.write_behind [size ...]
+"""
+from benchmarks import isolated_cwd, measure, summary
+from models.base import DATA, JOURNALS
+from models.user import User
+from models.write_behind import WriteBehind
+import models.base
+import sys
+
+
+def bench(size: int, write_behind: bool, n: int = 200) -> dict:
+    """ Save `n` new users in a store already holding `size` users
+    """
+    with isolated_cwd():
+        flusher = WriteBehind(interval=0.05, max_dirty=100)
+        models.base.FLUSHER = flusher
+        User._write_behind = write_behind
+        User._journal = False
+        JOURNALS.pop("User", None)
+        DATA["User"] = {}
+        for i in range(size):
+            user = User(email="u{}@example.com".format(i))
+            DATA["User"][user.id] = user
+        User.save_to_file()
+
+        def save_one(i: int):
+            user = User(email="new{}@example.com".format(i))
+            user.save()
+
+        result = summary(measure(save_one, n))
+        flusher.shutdown()
+        result.update(flusher.stats())
+        User.load_from_file()
+        assert User.count() == size + n, "lost updates"
+        User._write_behind = False
+        return result
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [1000, 10000]
+    print("{:>8} {:>12} {:>10} {:>10} {:>8} {:>12}".format(
+        "users", "mode", "p50 ms", "p99 ms", "flushes", "max lag ms"))
+    for size in sizes:
+        for write_behind in (False, True):
+            res = bench(size, write_behind)
+            print("{:>8} {:>12} {:>10.3f} {:>10.3f} {:>8} {:>12.1f}".format(
+                size, "write-behind" if write_behind else "rewrite",
+                res["p50_ms"], res["p99_ms"], res["flushes"],
+                res["max_lag_ms"]))
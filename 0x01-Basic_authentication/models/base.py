@@ -2,20 +2,104 @@
 """ Base module
 """
 from datetime import datetime
-from typing import TypeVar, List, Iterable
-from os import path
-import json
+from typing import Callable, TypeVar, List, Iterable, Iterator
+from os import getenv, path, replace
+from models.group_commit import GroupCommit
+from models.index import Index
+from models.journal import Journal
+from models.metrics import timed
+from models.mmap_store import MmapStore
+from models.serializers import SERIALIZERS
+from models.write_behind import WriteBehind
+from threading import Lock, RLock
+import bisect
+import os
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+JOURNALS = {}
+INDEXES = {}
+LISTENERS = {}
+FIELDS = {}
+STORES = {}
+LOCKS = {}
+FLUSH_LOCKS = {}
+COMMITS = {}
+SORTED_IDS = {}
+
+JOURNAL_ENABLED = getenv("MODELS_JOURNAL", "0") == "1"
+JOURNAL_COMPACT_THRESHOLD = int(getenv("MODELS_JOURNAL_COMPACT", "1000"))
+LAZY_LOAD = getenv("MODELS_LAZY_LOAD", "0") == "1"
+FORMAT = getenv("MODELS_FORMAT", "json")
+MMAP_ENABLED = getenv("MODELS_MMAP", "0") == "1"
+WRITE_BEHIND = getenv("MODELS_WRITE_BEHIND", "0") == "1"
+FLUSHER = WriteBehind(float(getenv("MODELS_FLUSH_INTERVAL", "1.0")),
+                      int(getenv("MODELS_FLUSH_MAX_DIRTY", "1000")))
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """ Parse a TIMESTAMP_FORMAT timestamp
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def _atomic_dump(dump: Callable, data, file_path: str):
+    """ Write `file_path` with `dump(data, tmp_path)` then rename it over
+    the previous file: readers and crashes see the old or the new file,
+    never a truncated one
+    """
+    tmp_path = file_path + ".tmp"
+    dump(data, tmp_path)
+    replace(tmp_path, file_path)
+    dir_fd = os.open(path.dirname(path.abspath(file_path)), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
 
 
 class Base():
     """ Base class
+
+    Attributes are stored in `__slots__` (no per-instance `__dict__`):
+    subclasses declare theirs the same way to stay compact, a subclass
+    without `__slots__` simply gets a `__dict__` back.
     """
 
+    __slots__ = ('id', 'created_at', 'updated_at')
+
+    # Journal mode: save/remove append one record to `.db_<Class>.journal`
+    # instead of rewriting the `.db_<Class>.<ext>` snapshot, which is rewritten
+    # (compaction) once the journal is bigger than the live objects.
+    _journal = JOURNAL_ENABLED
+    _journal_compact_threshold = JOURNAL_COMPACT_THRESHOLD
+
+    # Attributes indexed in memory: `search()` on them doesn't scan DATA
+    _indexes = ()
+
+    # Lazy load: `load_from_file()` keeps the JSON dictionaries in DATA and
+    # objects are built on first access (`get()`, `search()`...)
+    _lazy_load = LAZY_LOAD
+
+    # File format of `.db_<Class>.<ext>`, see models.serializers
+    _serializer = SERIALIZERS[FORMAT]
+
+    # Memory-mapped mode (binary format only): records stay in the mapped
+    # snapshot and are decoded on access; DATA only holds the objects saved
+    # since the snapshot was written. Indexes are built once at load, and
+    # mutations always go to the journal (a snapshot rewrite re-encodes
+    # every record).
+    _mmap = MMAP_ENABLED
+
+    # Write-behind mode: save/remove only mark the class dirty, FLUSHER
+    # rewrites the snapshot from a background thread (journal not used)
+    _write_behind = WRITE_BEHIND
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
@@ -24,14 +108,19 @@ class Base():
             DATA[s_class] = {}
 
         self.id = kwargs.get('id', str(uuid.uuid4()))
-        if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+        created_at = kwargs.get('created_at')
+        updated_at = kwargs.get('updated_at')
+        if created_at is not None:
+            self.created_at = _parse_timestamp(created_at)
         else:
             self.created_at = datetime.utcnow()
-        if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+        # datetimes are immutable: share one object while both are equal
+        if updated_at is not None and updated_at == created_at:
+            self.updated_at = self.created_at
+        elif updated_at is not None:
+            self.updated_at = _parse_timestamp(updated_at)
+        elif created_at is None:
+            self.updated_at = self.created_at
         else:
             self.updated_at = datetime.utcnow()
 
@@ -44,11 +133,36 @@ class Base():
             return False
         return (self.id == other.id)
 
+    @classmethod
+    def _fields(cls, for_serialization: bool) -> tuple:
+        """ Slot attributes serialized by `to_json`, computed once per class
+        """
+        key = (cls, for_serialization)
+        if FIELDS.get(key) is None:
+            fields = []
+            for klass in reversed(cls.__mro__):
+                for name in klass.__dict__.get('__slots__', ()):
+                    if name in ('__dict__', '__weakref__') or name in fields:
+                        continue
+                    if for_serialization or name[0] != '_':
+                        fields.append(name)
+            FIELDS[key] = tuple(fields)
+        return FIELDS[key]
+
     def to_json(self, for_serialization: bool = False) -> dict:
         """ Convert the object a JSON dictionary
         """
         result = {}
-        for key, value in self.__dict__.items():
+        for key in self._fields(for_serialization):
+            try:
+                value = getattr(self, key)
+            except AttributeError:
+                continue
+            if type(value) is datetime:
+                result[key] = value.isoformat(timespec='seconds')
+            else:
+                result[key] = value
+        for key, value in getattr(self, '__dict__', {}).items():
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
@@ -58,54 +172,342 @@ class Base():
         return result
 
     @classmethod
+    @timed("load_from_file")
     def load_from_file(cls):
-        """ Load all objects from file
+        """ Load all objects from file, then replay the journal
+
+        The file is read incrementally; in lazy load mode the objects are
+        only built on first access.
+        """
+        with cls._lock():
+            cls._load_from_file()
+
+    @classmethod
+    def _load_from_file(cls):
+        """ Body of `load_from_file`, the lock of the class being held
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
+        file_path = cls._file_path()
         DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
+        cls._close_store()
+        if cls._lazy_load:
+            def build(obj_json): return obj_json
+        else:
+            def build(obj_json): return cls(**obj_json)
+        if cls._mmap:
+            if cls._serializer.name != "binary":
+                raise ValueError("Memory-mapped mode needs the binary format")
+            if path.exists(file_path):
+                with open(file_path, 'rb') as f:
+                    header = cls._serializer.read_header(f)
+                if header["index_offset"] is None:
+                    # written before the id index: rewrite it with one
+                    for obj_id, obj_json in cls._serializer.load(file_path):
+                        DATA[s_class][obj_id] = obj_json
+                    cls._save_mmap()
+                else:
+                    STORES[s_class] = MmapStore(file_path)
+        elif path.exists(file_path):
+            for obj_id, obj_json in cls._serializer.load(file_path):
+                DATA[s_class][obj_id] = build(obj_json)
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+        for op, obj_id, obj_json in cls._get_journal().replay():
+            if op == "save":
+                cls._put(obj_id, build(obj_json))
+            elif op == "remove":
+                cls._drop(obj_id)
+        SORTED_IDS.pop(s_class, None)
+        cls._reindex()
 
     @classmethod
+    @timed("save_to_file")
     def save_to_file(cls):
         """ Save all objects to file
+
+        The objects are serialized under the lock of the class, the file is
+        written outside of it (mutations go on meanwhile) and atomically
+        replaces the previous one.
+        """
+        s_class = cls.__name__
+        with FLUSH_LOCKS.setdefault(s_class, Lock()):
+            if cls._mmap:
+                with cls._lock():
+                    cls._save_mmap()
+                    cls._get_journal().truncate()
+                return
+            with cls._lock():
+                objs_json = {}
+                for obj_id, obj in DATA[s_class].items():
+                    if type(obj) is dict:
+                        objs_json[obj_id] = obj
+                    else:
+                        objs_json[obj_id] = obj.to_json(True)
+                cls._get_journal().rotate()
+
+            _atomic_dump(cls._serializer.dump, objs_json, cls._file_path())
+            cls._get_journal().discard_rotated()
+
+    @classmethod
+    def _lock(cls) -> RLock:
+        """ Return the lock guarding DATA and the journal of the class
+        """
+        return LOCKS.setdefault(cls.__name__, RLock())
+
+    @classmethod
+    def _commit(cls):
+        """ Save all objects to file, coalesced with the concurrent calls
+        """
+        s_class = cls.__name__
+        if COMMITS.get(s_class) is None:
+            COMMITS.setdefault(s_class, GroupCommit(cls.save_to_file))
+        COMMITS[s_class].commit()
+
+    @classmethod
+    def _save_mmap(cls):
+        """ Write a new snapshot merging the mapped records and the objects
+        saved since, without loading the records, then map it
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
+        store = STORES.get(s_class)
+        fields = list(store.fields) if store is not None else []
+        changed = {}
         for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+            changed[obj_id] = obj if type(obj) is dict else obj.to_json(True)
+            fields += [key for key in changed[obj_id] if key not in fields]
+
+        def items():
+            if store is not None:
+                for obj_id, obj_json in store.items():
+                    if obj_id not in changed and obj_id not in store.removed:
+                        yield obj_id, obj_json
+            yield from changed.items()
+
+        file_path = cls._file_path()
+        _atomic_dump(lambda data, tmp_path: cls._serializer.dump_items(
+            data, fields, tmp_path), items(), file_path)
+        # swapped, not closed: readers may still decode from the old one
+        STORES[s_class] = MmapStore(file_path)
+        DATA[s_class] = {}
+
+    @classmethod
+    def _close_store(cls):
+        """ Forget the snapshot of the class, if any; it is unmapped once
+        the last reader still holding it is done (MmapStore.__del__)
+        """
+        STORES.pop(cls.__name__, None)
+
+    @classmethod
+    def _put(cls, obj_id: str, obj):
+        """ Put an object (or its JSON dictionary) in DATA
+        """
+        s_class = cls.__name__
+        store = STORES.get(s_class)
+        if obj_id not in DATA[s_class]:
+            new = True
+            if store is not None:
+                if obj_id in store:
+                    new = obj_id in store.removed
+                    store.removed.discard(obj_id)
+                else:
+                    store.added += 1
+            ids = SORTED_IDS.get(s_class)
+            if new and ids is not None:
+                bisect.insort(ids, obj_id)
+        DATA[s_class][obj_id] = obj
+
+    @classmethod
+    def _drop(cls, obj_id: str) -> bool:
+        """ Remove an object from DATA (and from the mapped snapshot)
+
+        Returns:
+            True if the object existed
+        """
+        s_class = cls.__name__
+        store = STORES.get(s_class)
+        in_data = DATA[s_class].pop(obj_id, None) is not None
+        if store is None:
+            removed = in_data
+        elif obj_id not in store.removed and obj_id in store:
+            store.removed.add(obj_id)
+            removed = True
+        else:
+            if in_data:
+                store.added -= 1
+            removed = in_data
+        ids = SORTED_IDS.get(s_class)
+        if removed and ids is not None:
+            i = bisect.bisect_left(ids, obj_id)
+            if i < len(ids) and ids[i] == obj_id:
+                del ids[i]
+        return removed
+
+    @classmethod
+    def _file_path(cls) -> str:
+        """ Return the path of the snapshot file of the class
+        """
+        return ".db_{}.{}".format(cls.__name__, cls._serializer.extension)
+
+    @classmethod
+    def _get_journal(cls) -> Journal:
+        """ Return the journal of the class
+        """
+        s_class = cls.__name__
+        if JOURNALS.get(s_class) is None:
+            file_path = ".db_{}.journal".format(s_class)
+            JOURNALS[s_class] = Journal(file_path)
+        return JOURNALS[s_class]
+
+    @classmethod
+    def _get_indexes(cls) -> dict:
+        """ Return the indexes of the class, by attribute
+        """
+        s_class = cls.__name__
+        if INDEXES.get(s_class) is None:
+            INDEXES[s_class] = {attr: Index(attr) for attr in cls._indexes}
+        return INDEXES[s_class]
+
+    @classmethod
+    def _reindex(cls):
+        """ Rebuild all indexes of the class from DATA and the mapped
+        snapshot (each record decoded once, not kept)
+        """
+        s_class = cls.__name__
+        indexes = cls._get_indexes().items()
+        for attr, index in indexes:
+            index.clear()
+        store = STORES.get(s_class)
+        if store is not None and len(indexes) > 0:
+            for obj_id, obj_json in store.items():
+                if obj_id not in store.removed:
+                    for attr, index in indexes:
+                        index.add(obj_id, obj_json.get(attr))
+        for attr, index in indexes:
+            for obj_id, obj in DATA[s_class].items():
+                if type(obj) is dict:
+                    index.add(obj_id, obj.get(attr))
+                else:
+                    index.add(obj_id, getattr(obj, attr, None))
+
+    @classmethod
+    def _materialize(cls, obj_id: str) -> TypeVar('Base'):
+        """ Return the object `obj_id` of DATA, built from its JSON
+        dictionary if it wasn't accessed since a lazy load, or decoded
+        from the mapped snapshot (not kept in memory)
+        """
+        s_class = cls.__name__
+        obj = DATA[s_class].get(obj_id)
+        if type(obj) is dict:
+            obj = cls(**obj)
+            DATA[s_class][obj_id] = obj
+        store = STORES.get(s_class)
+        if obj is None and store is not None and obj_id is not None \
+                and obj_id not in store.removed:
+            obj_json = store.get(obj_id)
+            if obj_json is not None:
+                obj = cls(**obj_json)
+        return obj
+
+    @classmethod
+    def _iter_all(cls) -> Iterator[TypeVar('Base')]:
+        """ Yield all objects: DATA, then the mapped snapshot
+        """
+        s_class = cls.__name__
+        for obj_id in list(DATA[s_class].keys()):
+            yield cls._materialize(obj_id)
+        store = STORES.get(s_class)
+        if store is not None:
+            for obj_id, obj_json in store.items():
+                if obj_id not in DATA[s_class] and \
+                        obj_id not in store.removed:
+                    yield cls(**obj_json)
+
+    @classmethod
+    def on_change(cls, callback: Callable[[TypeVar('Base')], None]):
+        """ Register `callback(obj)`, called each time an object of the
+        class is saved or removed
+        """
+        LISTENERS.setdefault(cls.__name__, []).append(callback)
+
+    def _notify(self):
+        """ Call the listeners registered for the class of the object
+        """
+        for callback in LISTENERS.get(self.__class__.__name__, []):
+            callback(self)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+    @classmethod
+    def _persist(cls, op: str, objs: List[TypeVar('Base')]):
+        """ Persist mutations `op` of `objs`: hand them to the write-behind
+        flusher, append them to the journal (compacting when the journal
+        outgrows the live objects) or rewrite the whole file, once
+        """
+        if len(objs) == 0:
+            return
+        if cls._write_behind:
+            FLUSHER.mark(cls, len(objs))
+            return
+        if not cls._journal and not cls._mmap:
+            cls._commit()
+            return
+        with cls._lock():
+            journal = cls._get_journal()
+            journal.extend((op, obj.id, obj.to_json(True)
+                            if op == "save" else None) for obj in objs)
+            threshold = max(cls._journal_compact_threshold, cls.count())
+            compact = journal.size >= threshold
+        if compact:
+            cls._commit()
 
     def save(self):
         """ Save current object
         """
-        s_class = self.__class__.__name__
-        self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        self.__class__.bulk_save([self])
 
     def remove(self):
         """ Remove object
         """
-        s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        self.__class__.bulk_remove([self])
+
+    @classmethod
+    def bulk_save(cls, objs: Iterable[TypeVar('Base')]):
+        """ Save all `objs`, persisting them once
+        """
+        objs = list(objs)
+        now = datetime.utcnow()
+        with cls._lock():
+            indexes = cls._get_indexes().items()
+            for obj in objs:
+                obj.updated_at = now
+                cls._put(obj.id, obj)
+                for attr, index in indexes:
+                    index.add(obj.id, getattr(obj, attr, None))
+        cls._persist("save", objs)
+        for obj in objs:
+            obj._notify()
+
+    @classmethod
+    def bulk_remove(cls, objs: Iterable[TypeVar('Base')]):
+        """ Remove all `objs`, persisting them once
+        """
+        removed = []
+        with cls._lock():
+            indexes = cls._get_indexes().values()
+            for obj in objs:
+                if cls._drop(obj.id):
+                    for index in indexes:
+                        index.discard(obj.id)
+                    removed.append(obj)
+        cls._persist("remove", removed)
+        for obj in removed:
+            obj._notify()
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
         s_class = cls.__name__
+        store = STORES.get(s_class)
+        if store is not None:
+            return len(store) - len(store.removed) + store.added
         return len(DATA[s_class].keys())
 
     @classmethod
@@ -114,18 +516,53 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def ids_after(cls, after: str = None) -> Iterator[str]:
+        """ IDs of all objects in ascending order, starting with the first
+        one greater than `after` (which doesn't have to exist)
+
+        The sorted IDs are built once and kept up to date by `_put` and
+        `_drop`, so a page costs a binary search rather than a scan of the
+        objects before it; each step seeks from the last ID returned, so
+        concurrent additions and removals neither repeat nor skip objects.
+        """
+        s_class = cls.__name__
+        with cls._lock():
+            ids = SORTED_IDS.get(s_class)
+            if ids is None or len(ids) != cls.count():
+                ids = set(DATA[s_class].keys())
+                store = STORES.get(s_class)
+                if store is not None:
+                    ids.update(obj_id for obj_id in store.ids()
+                               if obj_id not in store.removed)
+                ids = SORTED_IDS[s_class] = sorted(ids)
+        return cls._seek_ids(ids, after)
+
+    @staticmethod
+    def _seek_ids(ids: List[str], after: str) -> Iterator[str]:
+        """ IDs of the sorted list `ids` greater than `after`, the list
+        being searched again for each ID
+        """
+        while True:
+            i = 0 if after is None else bisect.bisect_right(ids, after)
+            if i >= len(ids):
+                return
+            after = ids[i]
+            yield after
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
-        s_class = cls.__name__
-        return DATA[s_class].get(id)
+        return cls._materialize(id)
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
+
+        The most selective index among the searched attributes narrows the
+        candidates; DATA is scanned only if none of them is indexed.
         """
-        s_class = cls.__name__
         def _search(obj):
             if len(attributes) == 0:
                 return True
@@ -133,5 +570,16 @@ class Base():
                 if (getattr(obj, k) != v):
                     return False
             return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+
+        candidates = None
+        indexes = cls._get_indexes()
+        for k, v in attributes.items():
+            if indexes.get(k) is None:
+                continue
+            ids = indexes[k].lookup(v)
+            if candidates is None or len(ids) < len(candidates):
+                candidates = ids
+        if candidates is None:
+            return list(filter(_search, cls._iter_all()))
+        objs = [cls._materialize(obj_id) for obj_id in candidates]
+        return [obj for obj in objs if obj is not None and _search(obj)]
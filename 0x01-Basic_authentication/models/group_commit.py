@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+""" Group commit module
+"""
+from threading import Condition
+from typing import Callable
+
+
+class GroupCommit():
+    """ Coalesce concurrent flush requests into as few flushes as possible
+
+    A thread calling `commit()` after a mutation returns once a flush
+    *started after* its request is done. While one thread (the leader)
+    flushes, the others wait; the next leader then flushes once for all of
+    them.
+    """
+
+    def __init__(self, flush: Callable[[], None]):
+        """ Initialize a GroupCommit calling `flush()` to persist
+        """
+        self._flush = flush
+        self._cond = Condition()
+        self._requested = 0
+        self._flushed = 0
+        self._flushing = False
+        self.flushes = 0
+        self.commits = 0
+
+    def commit(self):
+        """ Return once the mutations made before the call are flushed
+
+        Raises:
+            the exception of the flush made by this thread, if any
+        """
+        with self._cond:
+            self._requested += 1
+            self.commits += 1
+            ticket = self._requested
+            while self._flushed < ticket:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                self._flushing = True
+                target = self._requested
+                self._cond.release()
+                try:
+                    self._flush()
+                finally:
+                    self._cond.acquire()
+                    self._flushing = False
+                    self._cond.notify_all()
+                self._flushed = max(self._flushed, target)
+                self.flushes += 1
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+""" Index module
+"""
+from typing import Set
+
+
+class Index():
+    """ Secondary index: map each value of one attribute to the ids of
+    the objects holding it
+    """
+
+    def __init__(self, attribute: str):
+        """ Initialize an empty Index on `attribute`
+        """
+        self.attribute = attribute
+        self._ids = {}
+        self._values = {}
+        self._unhashable = set()
+
+    def add(self, obj_id: str, value):
+        """ Index (or re-index) the object `obj_id` under `value`
+        """
+        self.discard(obj_id)
+        try:
+            self._ids.setdefault(value, set()).add(obj_id)
+        except TypeError:
+            self._unhashable.add(obj_id)
+            return
+        self._values[obj_id] = value
+
+    def discard(self, obj_id: str):
+        """ Remove the object `obj_id` from the index
+        """
+        self._unhashable.discard(obj_id)
+        if obj_id not in self._values:
+            return
+        value = self._values.pop(obj_id)
+        ids = self._ids.get(value)
+        ids.discard(obj_id)
+        if len(ids) == 0:
+            del self._ids[value]
+
+    def lookup(self, value) -> Set[str]:
+        """ Return the ids of the objects indexed under `value`
+        """
+        try:
+            ids = self._ids.get(value, set())
+        except TypeError:
+            ids = set()
+        if len(self._unhashable) > 0:
+            return ids | self._unhashable
+        return ids
+
+    def clear(self):
+        """ Remove all objects from the index
+        """
+        self._ids = {}
+        self._values = {}
+        self._unhashable = set()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+""" Journal module
+"""
+from os import path, remove, replace
+from typing import Iterable, Iterator, Tuple
+import json
+
+
+class Journal():
+    """ Append-only log of the mutations of one model class
+
+    Each line is a JSON record: `{"op": "save", "id": ..., "obj": {...}}`
+    or `{"op": "remove", "id": ...}`. Replaying the journal on top of the
+    last snapshot rebuilds the current state of the class.
+
+    While a snapshot is written, the records it contains are moved aside
+    (`rotate`) to `<file_path>.old`, so that new records can be appended
+    meanwhile; they are dropped (`discard_rotated`) once the snapshot is
+    safely on disk.
+    """
+
+    def __init__(self, file_path: str):
+        """ Initialize a Journal on `file_path`
+        """
+        self.file_path = file_path
+        self.rotated_path = file_path + ".old"
+        self.size = 0
+        self._file = None
+        if path.exists(file_path):
+            with open(file_path, 'r') as f:
+                self.size = sum(1 for _ in f)
+
+    def append(self, op: str, obj_id: str, obj_json: dict = None):
+        """ Append one record at the end of the journal
+        """
+        self.extend([(op, obj_id, obj_json)])
+
+    def extend(self, records: Iterable[Tuple[str, str, dict]]):
+        """ Append records (op, id, obj) with a single write
+        """
+        lines = []
+        for op, obj_id, obj_json in records:
+            record = {"op": op, "id": obj_id}
+            if obj_json is not None:
+                record["obj"] = obj_json
+            lines.append(json.dumps(record) + "\n")
+        if self._file is None:
+            self._file = open(self.file_path, 'a')
+        self._file.write("".join(lines))
+        self._file.flush()
+        self.size += len(lines)
+
+    def replay(self) -> Iterator[Tuple[str, str, dict]]:
+        """ Yield all records (op, id, obj) in write order
+
+        A truncated last line (crash in the middle of an append) is ignored.
+        """
+        for file_path in (self.rotated_path, self.file_path):
+            if not path.exists(file_path):
+                continue
+            with open(file_path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    yield (record.get("op"), record.get("id"),
+                           record.get("obj"))
+
+    def rotate(self):
+        """ Move the current records aside, new records start a new file
+        """
+        self.close()
+        if path.exists(self.file_path):
+            if path.exists(self.rotated_path):
+                with open(self.file_path, 'r') as src, \
+                        open(self.rotated_path, 'a') as dst:
+                    dst.write(src.read())
+                remove(self.file_path)
+            else:
+                replace(self.file_path, self.rotated_path)
+        self.size = 0
+
+    def discard_rotated(self):
+        """ Drop the records moved aside by `rotate`
+        """
+        if path.exists(self.rotated_path):
+            remove(self.rotated_path)
+
+    def truncate(self):
+        """ Drop all records, once they are part of a snapshot
+        """
+        self.rotate()
+        self.discard_rotated()
+
+    def close(self):
+        """ Close the underlying file
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
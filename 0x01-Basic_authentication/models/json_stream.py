@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+""" Incremental JSON reader module
+"""
+from typing import IO, Any, Iterator, Tuple
+import json
+
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# a number followed by one of these was cut by the end of a chunk
+_NUMBER_TAIL = ".eE0123456789"
+
+
+def _is_number(value: Any) -> bool:
+    """ True if `value` was decoded from a JSON number
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def iter_object_items(f: IO[str],
+                      chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Any]]:
+    """ Yield the (key, value) pairs of the JSON object stored in `f`,
+    reading it by chunks: memory stays proportional to one value instead
+    of the whole file
+
+    Raises:
+        ValueError: the file is not a JSON object
+    """
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        """ Drop the consumed part of the buffer and read one more chunk
+        """
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if chunk == "":
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_whitespace():
+        """ Move `pos` to the next significant character
+        """
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+
+    def expect(chars: str) -> str:
+        """ Consume one of `chars`
+        """
+        nonlocal pos
+        skip_whitespace()
+        if pos >= len(buf) or buf[pos] not in chars:
+            raise ValueError("Expecting one of '{}' at {}".format(chars, pos))
+        pos += 1
+        return buf[pos - 1]
+
+    def decode():
+        """ Decode the next JSON value, reading more until it is complete
+        """
+        nonlocal pos
+        skip_whitespace()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(buf, pos)
+                if eof or end < len(buf) and not (
+                        _is_number(value) and buf[end] in _NUMBER_TAIL):
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            if not fill():
+                value, pos = _DECODER.raw_decode(buf, pos)
+                return value
+
+    fill()
+    expect("{")
+    skip_whitespace()
+    if pos < len(buf) and buf[pos] == "}":
+        return
+    while True:
+        key = decode()
+        expect(":")
+        value = decode()
+        yield key, value
+        if expect(",}") == "}":
+            return
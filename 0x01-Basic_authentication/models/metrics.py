@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+""" Metrics module: counters and histograms rendered in the Prometheus
+text exposition format
+
+Disabled unless METRICS_ENABLED=1: `timed` then returns the function
+itself and the metrics record nothing.
+"""
+from functools import wraps
+from os import getenv
+from threading import Lock
+from time import perf_counter
+from typing import Callable, List, Tuple
+
+
+ENABLED = getenv("METRICS_ENABLED", "0") == "1"
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names: Tuple[str], values: Tuple[str], extra: str = "") -> str:
+    """ `{name="value",...}` part of a sample line
+    """
+    pairs = ['{}="{}"'.format(n, str(v).replace("\\", "\\\\")
+                              .replace('"', '\\"').replace("\n", "\\n"))
+             for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter():
+    """ Monotonic counter, one value per combination of labels
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Tuple[str] = ()):
+        """ Initialize a Counter
+        """
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        """ Add `amount` to the value of `labels` (in `labelnames` order)
+        """
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        """ Sample lines of the counter
+        """
+        with self._lock:
+            values = sorted(self._values.items())
+        return ["{}{} {}".format(self.name, _labels(self.labelnames, k), v)
+                for k, v in values]
+
+
+class Histogram():
+    """ Distribution of observed values (e.g. durations in seconds) in
+    cumulative buckets, one distribution per combination of labels
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: Tuple[str] = (),
+                 buckets: Tuple[float] = BUCKETS):
+        """ Initialize a Histogram
+        """
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *labels: str):
+        """ Record `value` for `labels` (in `labelnames` order)
+        """
+        if not ENABLED:
+            return
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets),
+                                                0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[str]:
+        """ Sample lines of the histogram: cumulative buckets, sum, count
+        """
+        with self._lock:
+            values = sorted((k, ([*s[0]], s[1], s[2]))
+                            for k, s in self._values.items())
+        lines = []
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append("{}_bucket{} {}".format(
+                    self.name, _labels(self.labelnames, labels,
+                                       'le="{}"'.format(bound)), cumulative))
+            lines.append("{}_bucket{} {}".format(
+                self.name, _labels(self.labelnames, labels, 'le="+Inf"'),
+                count))
+            lines.append("{}_sum{} {}".format(
+                self.name, _labels(self.labelnames, labels), total))
+            lines.append("{}_count{} {}".format(
+                self.name, _labels(self.labelnames, labels), count))
+        return lines
+
+
+class Collected():
+    """ Metric read at render time from `collect()`, which returns the
+    current value of each combination of labels (counters or gauges kept
+    by another component)
+    """
+
+    def __init__(self, name: str, doc: str, kind: str,
+                 labelnames: Tuple[str], collect: Callable[[], dict]):
+        """ Initialize a Collected metric of type `kind` (`counter` or
+        `gauge`)
+        """
+        self.name = name
+        self.doc = doc
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def samples(self) -> List[str]:
+        """ Sample lines of the values collected now
+        """
+        return ["{}{} {}".format(self.name, _labels(self.labelnames, k), v)
+                for k, v in sorted(self.collect().items())]
+
+
+class Registry():
+    """ Set of metrics rendered together
+    """
+
+    def __init__(self):
+        """ Initialize an empty Registry
+        """
+        self._metrics = {}
+
+    def register(self, metric):
+        """ Add `metric` and return it
+        """
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """ All metrics in the text exposition format
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append("# HELP {} {}".format(metric.name, metric.doc))
+            lines.append("# TYPE {} {}".format(metric.name, metric.kind))
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REQUESTS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Duration of the HTTP requests",
+    ("method", "route", "status")))
+AUTH_OUTCOMES = REGISTRY.register(Counter(
+    "auth_outcomes_total", "Outcomes of the authentication checks",
+    ("action", "outcome")))
+SPANS = REGISTRY.register(Histogram(
+    "span_duration_seconds", "Duration of the instrumented operations",
+    ("span",)))
+
+
+def timed(span: str) -> Callable:
+    """ Decorator recording the duration of each call in SPANS under
+    `span`; returns the function itself when metrics are disabled
+    """
+    def decorator(fn: Callable) -> Callable:
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                SPANS.observe(perf_counter() - start, span)
+        return wrapper
+    return decorator
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+""" Memory-mapped store module
+"""
+from models.serializers import BinarySerializer
+from typing import Iterator, Tuple
+import marshal
+import mmap
+
+
+class MmapStore():
+    """ Read-only, memory-mapped view of a binary snapshot
+
+    Records are decoded on demand: `get(id)` looks the id up by binary
+    search in the fixed-layout index of the file and decodes that record
+    only, so resident memory doesn't grow with the number of records.
+
+    Changes made since the snapshot was written are tracked by the caller:
+    `removed` holds the ids of deleted records, `added` counts the objects
+    which are not in the snapshot.
+
+    A store replaced by a newer snapshot is not closed by its owner: the
+    file is unmapped when the store is collected, after its last reader.
+    """
+
+    def __init__(self, file_path: str):
+        """ Map `file_path`, a snapshot written by BinarySerializer
+
+        Raises:
+            ValueError: the file has no index (written before it existed),
+                saving the class again adds one
+        """
+        self.serializer = BinarySerializer()
+        self._file = open(file_path, 'rb')
+        header = self.serializer.read_header(self._file)
+        if header["index_offset"] is None:
+            self._file.close()
+            raise ValueError("{} has no index".format(file_path))
+        self.fields = header["fields"]
+        self._records_offset = header["records_offset"]
+        self._index_offset = header["index_offset"]
+        self._count = header["count"]
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.removed = set()
+        self.added = 0
+
+    def __len__(self) -> int:
+        """ Number of records of the snapshot
+        """
+        return self._count
+
+    def _record(self, offset: int) -> Tuple[str, int, int]:
+        """ (id, values offset, values size) of the record at `offset`
+        """
+        record = self.serializer.RECORD
+        id_size, values_size = record.unpack_from(self._mm, offset)
+        start = offset + record.size
+        obj_id = str(self._mm[start:start + id_size], "utf-8")
+        return obj_id, start + id_size, values_size
+
+    def _decode(self, values_offset: int, values_size: int) -> dict:
+        """ JSON dictionary of the values at `values_offset`
+        """
+        end = values_offset + values_size
+        return dict(zip(self.fields,
+                        marshal.loads(self._mm[values_offset:end])))
+
+    def _find(self, obj_id: str) -> Tuple[int, int]:
+        """ (values offset, values size) of the record `obj_id`, or None
+        """
+        entry = self.serializer.INDEX_ENTRY
+        target = self.serializer.id_hash(obj_id)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            h, _ = entry.unpack_from(
+                self._mm, self._index_offset + middle * entry.size)
+            if h < target:
+                low = middle + 1
+            else:
+                high = middle
+        while low < self._count:
+            h, offset = entry.unpack_from(
+                self._mm, self._index_offset + low * entry.size)
+            if h != target:
+                return None
+            record_id, values_offset, values_size = self._record(offset)
+            if record_id == obj_id:
+                return values_offset, values_size
+            low += 1
+        return None
+
+    def __contains__(self, obj_id: str) -> bool:
+        """ True if the snapshot holds a record `obj_id`
+        """
+        return self._find(obj_id) is not None
+
+    def get(self, obj_id: str) -> dict:
+        """ JSON dictionary of the record `obj_id`, or None
+        """
+        found = self._find(obj_id)
+        if found is None:
+            return None
+        return self._decode(*found)
+
+    def ids(self) -> Iterator[str]:
+        """ Yield the ids of all records, in file order, without decoding
+        their values
+        """
+        offset = self._records_offset
+        while offset < self._index_offset:
+            obj_id, values_offset, values_size = self._record(offset)
+            yield obj_id
+            offset = values_offset + values_size
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        """ Yield (id, JSON dictionary) of all records, in file order
+        """
+        offset = self._records_offset
+        while offset < self._index_offset:
+            obj_id, values_offset, values_size = self._record(offset)
+            yield obj_id, self._decode(values_offset, values_size)
+            offset = values_offset + values_size
+
+    def close(self):
+        """ Unmap and close the file
+        """
+        self._mm.close()
+        self._file.close()
+
+    def __del__(self):
+        """ Unmap and close the file of a store no longer referenced
+        """
+        if hasattr(self, "_mm"):
+            self.close()
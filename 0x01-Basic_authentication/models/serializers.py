@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+""" Serializers module: file formats of the models store
+
+    $ python3 -m models.serializers <Class> <from format> <to format>
+converts `.db_<Class>.<ext>` from one format to the other.
+"""
+from models.json_stream import iter_object_items
+from typing import Dict, Iterable, Iterator, List, Tuple
+import hashlib
+import json
+import marshal
+import os
+import struct
+import sys
+
+
+class Serializer():
+    """ File format of the snapshot of one model class
+    """
+    name = None
+    extension = None
+
+    def dump(self, objs_json: Dict[str, dict], file_path: str):
+        """ Write all objects (id -> JSON dictionary) to `file_path` and
+        flush it to disk
+        """
+        raise NotImplementedError
+
+    def load(self, file_path: str) -> Iterator[Tuple[str, dict]]:
+        """ Yield all (id, JSON dictionary) stored in `file_path`
+        """
+        raise NotImplementedError
+
+
+class JSONSerializer(Serializer):
+    """ One JSON object: `{"<id>": {...}, ...}`
+    """
+    name = "json"
+    extension = "json"
+
+    def dump(self, objs_json: Dict[str, dict], file_path: str):
+        """ Write all objects to `file_path`
+        """
+        with open(file_path, 'w') as f:
+            json.dump(objs_json, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self, file_path: str) -> Iterator[Tuple[str, dict]]:
+        """ Yield all objects, reading the file incrementally
+        """
+        with open(file_path, 'r') as f:
+            yield from iter_object_items(f)
+
+
+class BinarySerializer(Serializer):
+    """ Length-prefixed binary records
+
+    Layout: MAGIC, header length (uint32) and JSON header holding the field
+    names, then one record per object: id length (uint16), values length
+    (uint32), UTF-8 id, and the values in field order as a marshalled
+    tuple. Keys are written once in the header instead of in each record,
+    and records can be skipped without decoding them.
+
+    The records are followed by a fixed-layout index, one entry per record
+    (64-bit hash of the id, record offset) sorted by hash, and a footer
+    (index offset, number of records, FOOTER_MAGIC): a memory-mapped file
+    gives any record by id without loading the others (models.mmap_store).
+    Files written before the index (LEGACY_MAGIC) are still loaded.
+
+    Values must be marshallable (str, int, float, bool, None, lists and
+    dicts of them). A key missing from one object is loaded as None.
+    """
+    name = "binary"
+    extension = "bin"
+    MAGIC = b"MDB\x02"
+    LEGACY_MAGIC = b"MDB\x01"
+    FOOTER_MAGIC = b"MIDX"
+    RECORD = struct.Struct(">HI")
+    HEADER = struct.Struct(">I")
+    INDEX_ENTRY = struct.Struct(">QQ")
+    FOOTER = struct.Struct(">QQ4s")
+
+    @staticmethod
+    def id_hash(obj_id: str) -> int:
+        """ 64-bit hash of an id, stable across processes
+        """
+        digest = hashlib.blake2b(obj_id.encode("utf-8"), digest_size=8)
+        return int.from_bytes(digest.digest(), "big")
+
+    def dump(self, objs_json: Dict[str, dict], file_path: str):
+        """ Write all objects to `file_path`
+        """
+        fields = []
+        for obj_json in objs_json.values():
+            for key in obj_json:
+                if key not in fields:
+                    fields.append(key)
+        self.dump_items(objs_json.items(), fields, file_path)
+
+    def dump_items(self, items: Iterable[Tuple[str, dict]],
+                   fields: List[str], file_path: str):
+        """ Write the (id, JSON dictionary) of `items` to `file_path`,
+        consuming them one at a time
+        """
+        header = json.dumps({"fields": fields,
+                             "marshal": marshal.version}).encode("utf-8")
+        entries = []
+        with open(file_path, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(self.HEADER.pack(len(header)))
+            f.write(header)
+            for obj_id, obj_json in items:
+                entries.append((self.id_hash(obj_id), f.tell()))
+                id_bytes = obj_id.encode("utf-8")
+                values = marshal.dumps(tuple(obj_json.get(key)
+                                             for key in fields))
+                f.write(self.RECORD.pack(len(id_bytes), len(values)))
+                f.write(id_bytes)
+                f.write(values)
+            index_offset = f.tell()
+            entries.sort()
+            for entry in entries:
+                f.write(self.INDEX_ENTRY.pack(*entry))
+            f.write(self.FOOTER.pack(index_offset, len(entries),
+                                     self.FOOTER_MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read_header(self, f) -> dict:
+        """ Check the magic and return the header of an open file; for a
+        file with an index, `index_offset` and `count` come from the footer
+        """
+        magic = f.read(len(self.MAGIC))
+        if magic not in (self.MAGIC, self.LEGACY_MAGIC):
+            raise ValueError("Not a binary models file")
+        (size,) = self.HEADER.unpack(f.read(self.HEADER.size))
+        header = json.loads(f.read(size).decode("utf-8"))
+        if header["marshal"] > marshal.version:
+            raise ValueError("Written by a newer marshal format")
+        header["records_offset"] = f.tell()
+        header["index_offset"] = None
+        if magic == self.MAGIC:
+            f.seek(-self.FOOTER.size, 2)
+            index_offset, count, footer_magic = self.FOOTER.unpack(
+                f.read(self.FOOTER.size))
+            if footer_magic != self.FOOTER_MAGIC:
+                raise ValueError("Truncated binary models file")
+            header["index_offset"] = index_offset
+            header["count"] = count
+            f.seek(header["records_offset"])
+        return header
+
+    def load(self, file_path: str) -> Iterator[Tuple[str, dict]]:
+        """ Yield all objects, one record at a time
+        """
+        record_size = self.RECORD.size
+        with open(file_path, 'rb') as f:
+            header = self.read_header(f)
+            fields = header["fields"]
+            end = header["index_offset"]
+            while end is None or f.tell() < end:
+                head = f.read(record_size)
+                if len(head) < record_size:
+                    return
+                id_size, values_size = self.RECORD.unpack(head)
+                record = memoryview(f.read(id_size + values_size))
+                obj_id = str(record[:id_size], "utf-8")
+                values = marshal.loads(record[id_size:])
+                yield obj_id, dict(zip(fields, values))
+
+
+SERIALIZERS = {s.name: s for s in (JSONSerializer(), BinarySerializer())}
+
+
+def convert(s_class: str, src: str, dst: str):
+    """ Convert the snapshot `.db_<s_class>` from format `src` to `dst`
+    """
+    src, dst = SERIALIZERS[src], SERIALIZERS[dst]
+    src_path = ".db_{}.{}".format(s_class, src.extension)
+    dst_path = ".db_{}.{}".format(s_class, dst.extension)
+    dst.dump(dict(src.load(src_path)), dst_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: {} <Class> <from format> <to format>".format(
+            sys.argv[0]))
+        sys.exit(1)
+    convert(*sys.argv[1:])
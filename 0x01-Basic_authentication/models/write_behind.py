@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+""" Write-behind module
+"""
+from threading import Condition, Lock, Thread
+from typing import Dict
+import time
+
+
+class WriteBehind():
+    """ Persist model classes from a background thread
+
+    `mark(cls)` records that `cls` has unsaved mutations and returns at
+    once; the flusher thread rewrites the file of each dirty class when the
+    oldest unsaved mutation is `interval` seconds old, or as soon as
+    `max_dirty` mutations are pending. Mutations not flushed yet are lost
+    on a crash: `flush()` persists them synchronously and `shutdown()`
+    stops the thread after a last flush.
+    """
+
+    def __init__(self, interval: float = 1.0, max_dirty: int = 1000):
+        """ Initialize a WriteBehind flushing every `interval` seconds or
+        every `max_dirty` mutations
+        """
+        self.interval = interval
+        self.max_dirty = max_dirty
+        self._cond = Condition()
+        self._flush_lock = Lock()
+        self._dirty = {}
+        self._pending = 0
+        self._thread = None
+        self._stopped = False
+        self.flushes = 0
+        self.errors = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def mark(self, cls, count: int = 1):
+        """ Record `count` unsaved mutations of the model class `cls`
+        """
+        with self._cond:
+            if not self._stopped:
+                clean = cls not in self._dirty
+                first, dirty = self._dirty.get(cls, (time.monotonic(), 0))
+                self._dirty[cls] = (first, dirty + count)
+                self._pending += count
+                if self._thread is None:
+                    self._thread = Thread(target=self._run, daemon=True,
+                                          name="models-write-behind")
+                    self._thread.start()
+                # a clean class arms the interval timeout of the thread
+                if clean or self._pending >= self.max_dirty:
+                    self._cond.notify()
+                return
+        cls.save_to_file()
+
+    def flush(self):
+        """ Persist all dirty classes now; durable once it returns
+
+        Raises:
+            the first error of a class, which stays dirty
+        """
+        with self._flush_lock:
+            with self._cond:
+                dirty, self._dirty, self._pending = self._dirty, {}, 0
+            error = None
+            for cls, (first, count) in dirty.items():
+                try:
+                    cls.save_to_file()
+                except Exception as e:
+                    with self._cond:
+                        self.errors += 1
+                        other = self._dirty.get(cls, (first, 0))
+                        self._dirty[cls] = (first, other[1] + count)
+                        self._pending += count
+                    error = error or e
+                    continue
+                lag = time.monotonic() - first
+                with self._cond:
+                    self.flushes += 1
+                    self.last_lag = lag
+                    self.max_lag = max(self.max_lag, lag)
+            if error is not None:
+                raise error
+
+    def _run(self):
+        """ Flusher thread: wait for the interval or the threshold, flush
+        """
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if self._pending >= self.max_dirty:
+                        break
+                    timeout = None
+                    if self._dirty:
+                        timeout = self._oldest() + self.interval - \
+                            time.monotonic()
+                        if timeout <= 0:
+                            break
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                time.sleep(self.interval)
+
+    def _oldest(self) -> float:
+        """ Time of the oldest unsaved mutation
+        """
+        return min(first for first, _ in self._dirty.values())
+
+    def shutdown(self):
+        """ Stop the flusher thread and flush what is left; later
+        mutations are persisted synchronously
+        """
+        with self._cond:
+            self._stopped = True
+            thread = self._thread
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        """ Pending mutations, flushes, errors and flush lag (ms): the age of
+        the oldest unsaved mutation, the lag of the last and slowest flushes
+        """
+        with self._cond:
+            oldest = time.monotonic() - self._oldest() if self._dirty else 0
+            return {
+                "pending": self._pending,
+                "flushes": self.flushes,
+                "errors": self.errors,
+                "oldest_dirty_ms": oldest * 1000,
+                "last_lag_ms": self.last_lag * 1000,
+                "max_lag_ms": self.max_lag * 1000,
+            }
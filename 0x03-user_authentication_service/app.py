@@ -1,14 +1,61 @@
 #!/usr/bin/env python3
 """ Module for basic Flask app
 """
-from flask import Flask, jsonify, request, abort, make_response, redirect
+from flask import (Flask, Response, jsonify, request, abort, make_response,
+                   redirect, g)
 from auth import Auth
+from hashing import HashingBusy, register_metrics
+from time import perf_counter
+import metrics
+import profiling
 
 
 app = Flask(__name__)
+profiling.install(app)
 AUTH = Auth()
 
 
+@app.teardown_appcontext
+def release_db_session(exception=None) -> None:
+    """ Give the database connection of the request back to the pool
+    """
+    AUTH.release_db_session()
+
+
+if metrics.ENABLED:
+    register_metrics(metrics.REGISTRY, lambda: AUTH._hasher)
+
+    @app.before_request
+    def start_timer() -> None:
+        """ Start timing the request
+        """
+        g.request_start = perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        """ Record the duration of the request by route
+        """
+        start = g.get("request_start")
+        if start is not None:
+            rule = request.url_rule
+            metrics.REQUESTS.observe(
+                perf_counter() - start, request.method,
+                rule.rule if rule is not None else "unmatched",
+                response.status_code)
+        return response
+
+
+@app.route("/metrics", strict_slashes=False)
+def get_metrics():
+    """ Route exposing the metrics in the Prometheus text format, 404 when
+    they are disabled (METRICS_ENABLED)
+    """
+    if not metrics.ENABLED:
+        abort(404)
+    return Response(metrics.REGISTRY.render(),
+                    mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/", strict_slashes=False)
 def home():
     """ Route for the home page
@@ -29,6 +76,8 @@ def users():
             return jsonify({"email": email, "message": "user created"})
         except ValueError:
             return jsonify({"message": "email already registered"}), 400
+        except HashingBusy:
+            return abort(429)
 
 
 @app.route("/sessions", strict_slashes=False, methods=["POST"])
@@ -41,7 +90,13 @@ def login():
     email = data.get("email")
     password = data.get("password")
     if email and password:
-        if AUTH.valid_login(email, password):
+        try:
+            valid = AUTH.valid_login(email, password)
+        except HashingBusy:
+            metrics.AUTH_OUTCOMES.inc("login", "busy")
+            return abort(429)
+        metrics.AUTH_OUTCOMES.inc("login", "ok" if valid else "denied")
+        if valid:
             session_id = AUTH.create_session(email)
             result = jsonify({"email": email, "message": "logged in"})
             res = make_response(result)
@@ -66,11 +121,14 @@ def logout():
     if session_id:
         user = AUTH.get_user_from_session_id(session_id)
         if user:
-            AUTH.destroy_session(user.id)
+            metrics.AUTH_OUTCOMES.inc("logout", "ok")
+            AUTH.destroy_session(user.id, session_id)
             return redirect('/')
         else:
+            metrics.AUTH_OUTCOMES.inc("logout", "denied")
             return abort(403)
     else:
+        metrics.AUTH_OUTCOMES.inc("logout", "missing")
         return abort(403)
 
 
@@ -83,9 +141,12 @@ def profile():
     if session_id:
         user = AUTH.get_user_from_session_id(session_id)
         if not user:
+            metrics.AUTH_OUTCOMES.inc("session", "denied")
             return abort(403)
+        metrics.AUTH_OUTCOMES.inc("session", "ok")
         return jsonify({"email": user.email})
     else:
+        metrics.AUTH_OUTCOMES.inc("session", "missing")
         return abort(403)
 
 
@@ -98,7 +159,9 @@ def get_reset_password_token():
         try:
             rst = AUTH.get_reset_password_token(email=email)
         except ValueError:
+            metrics.AUTH_OUTCOMES.inc("reset_token", "denied")
             return abort(403)
+        metrics.AUTH_OUTCOMES.inc("reset_token", "ok")
         return jsonify({"email": email, "reset_token": rst})
     else:
         return abort(400)
@@ -114,9 +177,14 @@ def update_password():
         return abort(400)
     try:
         AUTH.update_password(reset_token, new_password)
+        metrics.AUTH_OUTCOMES.inc("reset_password", "ok")
         return jsonify({"email": email, "message": "Password updated"})
     except ValueError:
+        metrics.AUTH_OUTCOMES.inc("reset_password", "denied")
         return abort(403)
+    except HashingBusy:
+        metrics.AUTH_OUTCOMES.inc("reset_password", "busy")
+        return abort(429)
 
 
 if __name__ == "__main__":
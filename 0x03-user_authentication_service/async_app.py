@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+""" ASGI version of app.py: same routes, served by an event loop
+
+    $ uvicorn async_app:app
+
+Database calls and password hashing run on worker threads (AsyncDB,
+HashingService.run_async), so one process serves many concurrent
+connections without a thread per request.
+"""
+from async_auth import AsyncAuth
+from hashing import HashingBusy
+from http.cookies import CookieError, SimpleCookie
+from typing import Awaitable, Callable, Dict, List, Tuple
+from urllib.parse import parse_qs
+import json
+
+
+AUTH = AsyncAuth()
+STATUS_TEXT = {200: "OK", 302: "Found", 400: "Bad Request",
+               401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+               405: "Method Not Allowed", 429: "Too Many Requests"}
+
+
+class Request:
+    """ HTTP request of an ASGI scope
+    """
+
+    def __init__(self, scope: dict, body: bytes) -> None:
+        """ Initialize a Request from the scope and the whole body
+        """
+        self.method = scope["method"]
+        self.path = scope["path"].rstrip("/") or "/"
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1")
+                        for k, v in scope.get("headers", [])}
+        self.body = body
+
+    @property
+    def form(self) -> Dict[str, str]:
+        """ Fields of an urlencoded body (first value of each)
+        """
+        fields = parse_qs(self.body.decode("utf-8", "replace"))
+        return {k: v[0] for k, v in fields.items()}
+
+    @property
+    def cookies(self) -> Dict[str, str]:
+        """ Cookies of the request
+        """
+        cookie = SimpleCookie()
+        try:
+            cookie.load(self.headers.get("cookie", ""))
+        except CookieError:
+            return {}
+        return {k: m.value for k, m in cookie.items()}
+
+
+class Response:
+    """ HTTP response: status, headers and body
+    """
+
+    def __init__(self, status: int = 200, body: bytes = b"",
+                 headers: List[Tuple[str, str]] = None) -> None:
+        """ Initialize a Response
+        """
+        self.status = status
+        self.body = body
+        self.headers = headers or []
+
+
+def json_response(data: dict, status: int = 200) -> Response:
+    """ JSON response of `data`
+    """
+    return Response(status, json.dumps(data).encode("utf-8"),
+                    [("content-type", "application/json")])
+
+
+def error(status: int) -> Response:
+    """ Error response, as `abort(status)`
+    """
+    return json_response({"error": STATUS_TEXT.get(status, "Error")}, status)
+
+
+async def home(request: Request) -> Response:
+    """ Route for the home page
+    """
+    return json_response({"message": "Bienvenue"})
+
+
+async def users(request: Request) -> Response:
+    """ Route to register a user
+    """
+    data = request.form
+    email = data.get("email")
+    password = data.get("password")
+    if not email or not password:
+        return error(400)
+    try:
+        await AUTH.register_user(email, password)
+        return json_response({"email": email, "message": "user created"})
+    except ValueError:
+        return json_response({"message": "email already registered"}, 400)
+    except HashingBusy:
+        return error(429)
+
+
+async def login(request: Request) -> Response:
+    """ Route to create a new session, stored in the `session_id` cookie
+    """
+    data = request.form
+    email = data.get("email")
+    password = data.get("password")
+    if not email or not password:
+        return error(400)
+    try:
+        valid = await AUTH.valid_login(email, password)
+    except HashingBusy:
+        return error(429)
+    if not valid:
+        return error(401)
+    session_id = await AUTH.create_session(email)
+    response = json_response({"email": email, "message": "logged in"})
+    response.headers.append(("set-cookie",
+                             "session_id={}; Path=/".format(session_id)))
+    return response
+
+
+async def logout(request: Request) -> Response:
+    """ Route to destroy the session of the user and redirect to the home
+    page
+    """
+    session_id = request.cookies.get("session_id")
+    user = await AUTH.get_user_from_session_id(session_id)
+    if user is None:
+        return error(403)
+    await AUTH.destroy_session(user.id, session_id)
+    return Response(302, b"", [("location", "/")])
+
+
+async def profile(request: Request) -> Response:
+    """ Route to get the user profile
+    """
+    user = await AUTH.get_user_from_session_id(
+        request.cookies.get("session_id"))
+    if user is None:
+        return error(403)
+    return json_response({"email": user.email})
+
+
+async def get_reset_password_token(request: Request) -> Response:
+    """ Route to get the reset password token
+    """
+    email = request.form.get("email")
+    if not email:
+        return error(400)
+    try:
+        reset_token = await AUTH.get_reset_password_token(email)
+    except ValueError:
+        return error(403)
+    return json_response({"email": email, "reset_token": reset_token})
+
+
+async def update_password(request: Request) -> Response:
+    """ Route to update the password with a reset token
+    """
+    data = request.form
+    email = data.get("email")
+    reset_token = data.get("reset_token")
+    new_password = data.get("new_password")
+    if not email or not reset_token or not new_password:
+        return error(400)
+    try:
+        await AUTH.update_password(reset_token, new_password)
+        return json_response({"email": email, "message": "Password updated"})
+    except ValueError:
+        return error(403)
+    except HashingBusy:
+        return error(429)
+
+
+ROUTES = {
+    "/": {"GET": home},
+    "/users": {"POST": users},
+    "/sessions": {"POST": login, "DELETE": logout},
+    "/profile": {"GET": profile},
+    "/reset_password": {"POST": get_reset_password_token,
+                        "PUT": update_password},
+}
+
+
+async def dispatch(request: Request) -> Response:
+    """ Response of the route of `request`
+    """
+    methods = ROUTES.get(request.path)
+    if methods is None:
+        return error(404)
+    handler = methods.get(request.method)
+    if handler is None:
+        return error(405)
+    return await handler(request)
+
+
+async def read_body(receive: Callable[[], Awaitable[dict]]) -> bytes:
+    """ Whole body of an HTTP request
+    """
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def app(scope: dict, receive: Callable, send: Callable) -> None:
+    """ ASGI application
+    """
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                AUTH.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+    request = Request(scope, await read_body(receive))
+    response = await dispatch(request)
+    headers = [(k.encode("latin-1"), v.encode("latin-1"))
+               for k, v in response.headers]
+    headers.append((b"content-length", str(len(response.body)).encode()))
+    await send({"type": "http.response.start", "status": response.status,
+                "headers": headers})
+    await send({"type": "http.response.body", "body": response.body})
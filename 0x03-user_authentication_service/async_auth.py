@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+""" Async Auth module
+"""
+from async_db import AsyncDB
+from auth import (SESSION_MODE, SESSION_REFRESH, SESSION_TTL,
+                  _bcrypt_rounds, _check_password, _create_generation_store,
+                  _generate_uuid, _generation_key, _hash_password,
+                  _hash_rounds, _timestamp)
+from datetime import datetime
+from hashing import HashingBusy, HashingService
+from session_store import create_session_store
+from session_sweeper import SessionSweeper
+from session_token import create_session_tokens
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy.orm.exc import NoResultFound
+from time import time
+from typing import Union
+from user import User
+
+
+class AsyncAuth:
+    """ Coroutine version of Auth, on AsyncDB and the hashing workers
+    """
+
+    def __init__(self, db: AsyncDB = None):
+        self._db = db if db is not None else AsyncDB()
+        self._hasher = HashingService()
+        self.session_store = create_session_store()
+        self.session_tokens = None
+        self.generation_store = None
+        if SESSION_MODE == "signed":
+            self.session_tokens = create_session_tokens()
+            self.generation_store = _create_generation_store(
+                self.session_store)
+        self.session_sweeper = None
+        if SESSION_MODE == "table":
+            self.session_sweeper = SessionSweeper(self._db._db)
+            self.session_sweeper.start()
+        _bcrypt_rounds()
+
+    async def register_user(self, email: str, password: str) -> User:
+        """ See Auth.register_user
+        """
+        try:
+            await self._db.find_user_by(email=email)
+            raise ValueError(f"User {email} already exists")
+        except (NoResultFound, InvalidRequestError):
+            if email and password:
+                hashed_password = await self._hasher.run_async(
+                    _hash_password, password)
+                try:
+                    return await self._db.add_user(email, hashed_password)
+                except IntegrityError:
+                    raise ValueError(f"User {email} already exists")
+
+    async def valid_login(self, email: str, password: str) -> bool:
+        """ See Auth.valid_login
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except (NoResultFound, InvalidRequestError):
+            return False
+        if not await self._hasher.run_async(_check_password, password,
+                                            user.hashed_password):
+            return False
+        if _hash_rounds(user.hashed_password) != _bcrypt_rounds():
+            await self._rehash_password(user.id, password)
+        return True
+
+    async def _rehash_password(self, user_id: int, password: str) -> None:
+        """ See Auth._rehash_password
+        """
+        try:
+            hashed_password = await self._hasher.run_async(
+                _hash_password, password)
+        except HashingBusy:
+            return
+        await self._db.update_user(user_id, hashed_password=hashed_password)
+
+    async def create_session(self, email: str) -> str:
+        """ See Auth.create_session
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except (NoResultFound, InvalidRequestError):
+            return None
+        if self.session_tokens is not None:
+            self.generation_store.set(_generation_key(user.id),
+                                      {"generation": user.session_generation})
+            return self.session_tokens.issue(user.id, user.email,
+                                             user.session_generation)
+        if self.session_sweeper is not None:
+            session_id = _generate_uuid()
+            expires_at = time() + SESSION_TTL
+            await self._db.add_session(session_id, user.id,
+                                       datetime.utcfromtimestamp(expires_at))
+            self.session_store.set(session_id, {
+                "id": user.id, "email": user.email,
+                "expires_at": expires_at})
+            return session_id
+        session_id = _generate_uuid()
+        await self._db.update_user(user.id, session_id=session_id)
+        if user.session_id:
+            self.session_store.delete(user.session_id)
+        self.session_store.set(session_id,
+                               {"id": user.id, "email": user.email})
+        return session_id
+
+    async def get_user_from_session_id(
+            self, session_id: str) -> Union[User, None]:
+        """ See Auth.get_user_from_session_id
+        """
+        if not session_id:
+            return None
+        if self.session_tokens is not None:
+            claims = self.session_tokens.verify(session_id)
+            if claims is None or claims["generation"] != \
+                    await self._session_generation(claims["id"]):
+                return None
+            return User(id=claims["id"], email=claims["email"],
+                        session_id=session_id)
+        if self.session_sweeper is not None:
+            return await self._get_table_session(session_id)
+        cached = self.session_store.get(session_id)
+        if cached is not None:
+            return User(id=cached["id"], email=cached["email"],
+                        session_id=session_id)
+        try:
+            user = await self._db.find_user_by(session_id=session_id)
+        except (NoResultFound, InvalidRequestError):
+            return None
+        self.session_store.fill(session_id,
+                                {"id": user.id, "email": user.email})
+        return user
+
+    async def _get_table_session(
+            self, session_id: str) -> Union[User, None]:
+        """ See Auth._get_table_session
+        """
+        now = time()
+        cached = self.session_store.get(session_id)
+        if cached is None or cached["expires_at"] <= now:
+            try:
+                session = await self._db.find_session(session_id)
+            except NoResultFound:
+                self.session_store.delete(session_id)
+                return None
+            cached = {"id": session.user_id, "email": session.user.email,
+                      "expires_at": _timestamp(session.expires_at)}
+            if cached["expires_at"] <= now:
+                self.session_store.delete(session_id)
+                return None
+            self.session_store.fill(session_id, cached)
+        if cached["expires_at"] - now < SESSION_TTL - SESSION_REFRESH:
+            cached = dict(cached, expires_at=now + SESSION_TTL)
+            if not await self._db.touch_session(
+                    session_id,
+                    datetime.utcfromtimestamp(cached["expires_at"])):
+                self.session_store.delete(session_id)
+                return None
+            self.session_store.fill(session_id, cached)
+        return User(id=cached["id"], email=cached["email"],
+                    session_id=session_id)
+
+    async def destroy_session(self, user_id: int,
+                              session_id: str = None) -> None:
+        """ See Auth.destroy_session
+        """
+        if self.session_sweeper is not None:
+            if session_id:
+                await self._db.delete_session(session_id)
+                self.session_store.delete(session_id)
+                return
+            for token in await self._db.delete_user_sessions(user_id):
+                self.session_store.delete(token)
+            return
+        if self.session_tokens is not None:
+            await self._db.update_user(
+                user_id, session_generation=User.session_generation + 1)
+            self.generation_store.delete(_generation_key(user_id))
+            return
+        try:
+            session_id = (await self._db.find_user_by(id=user_id)).session_id
+        except (NoResultFound, InvalidRequestError):
+            session_id = None
+        await self._db.update_user(user_id, session_id=None)
+        if session_id:
+            self.session_store.delete(session_id)
+
+    async def _session_generation(self, user_id: int) -> Union[int, None]:
+        """ See Auth._session_generation
+        """
+        cached = self.generation_store.get(_generation_key(user_id))
+        if cached is not None:
+            return cached["generation"]
+        try:
+            user = await self._db.find_user_by(id=user_id)
+        except (NoResultFound, InvalidRequestError):
+            return None
+        self.generation_store.fill(_generation_key(user_id),
+                                   {"generation": user.session_generation})
+        return user.session_generation
+
+    async def get_reset_password_token(self, email: str) -> str:
+        """ See Auth.get_reset_password_token
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except (NoResultFound, InvalidRequestError):
+            raise ValueError
+        reset_token = _generate_uuid()
+        await self._db.update_user(user.id, reset_token=reset_token)
+        return reset_token
+
+    async def update_password(self, reset_token: str, password: str) -> None:
+        """ See Auth.update_password
+        """
+        if not reset_token or not password:
+            raise ValueError
+        try:
+            user = await self._db.find_user_by(reset_token=reset_token)
+        except (NoResultFound, InvalidRequestError):
+            raise ValueError
+        hashed_password = await self._hasher.run_async(_hash_password,
+                                                       password)
+        await self._db.update_user(user.id, hashed_password=hashed_password,
+                                   reset_token=None)
+
+    def shutdown(self) -> None:
+        """ Stop the session sweeper, the database and hashing workers
+        """
+        if self.session_sweeper is not None:
+            self.session_sweeper.stop()
+        self._db.shutdown()
+        self._hasher.shutdown()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+""" Async DB module
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from db import DB, DB_POOL_SIZE
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List
+from user import Base, User, UserSession
+import asyncio
+
+
+class AsyncDB:
+    """ Coroutine version of DB: each method runs the DB method on a pool
+    of worker threads, so the event loop never waits for SQLite
+
+    Each call uses the session of its worker and releases it before
+    returning; the users and sessions returned are detached, with all
+    their columns loaded.
+    """
+
+    def __init__(self, db: DB = None, workers: int = None) -> None:
+        """ Initialize a new AsyncDB
+
+        Args:
+            db (DB): database to wrap, defaults to a new DB()
+            workers (int): worker threads, defaults to AUTH_DB_POOL_SIZE
+        """
+        self._db = db if db is not None else DB()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or DB_POOL_SIZE, thread_name_prefix="db")
+
+    def _call(self, fn: Callable, *args, **kwargs) -> Any:
+        """ Worker side of a call: run it and release the session
+        """
+        try:
+            result = fn(*args, **kwargs)
+            if isinstance(result, Base):
+                for column in result.__table__.columns:
+                    getattr(result, column.key)
+            return result
+        finally:
+            self._db.remove_session()
+
+    async def _run(self, fn: Callable, *args, **kwargs) -> Any:
+        """ Run `fn(*args, **kwargs)` on a worker
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(self._call, fn, *args, **kwargs))
+
+    async def add_user(self, email: str, hashed_password: str) -> User:
+        """ See DB.add_user
+        """
+        return await self._run(self._db.add_user, email, hashed_password)
+
+    async def add_users(self, users: Iterable[Dict],
+                        batch_size: int = None) -> int:
+        """ See DB.add_users
+        """
+        return await self._run(self._db.add_users, list(users), batch_size)
+
+    async def find_user_by(self, *args, **kwargs) -> User:
+        """ See DB.find_user_by
+        """
+        return await self._run(self._db.find_user_by, *args, **kwargs)
+
+    async def update_user(self, user_id: int, **kwargs) -> None:
+        """ See DB.update_user
+        """
+        return await self._run(self._db.update_user, user_id, **kwargs)
+
+    async def update_users(self, updates: Iterable[Dict],
+                           batch_size: int = None) -> int:
+        """ See DB.update_users
+        """
+        return await self._run(self._db.update_users, list(updates),
+                               batch_size)
+
+    async def add_session(self, token: str, user_id: int,
+                          expires_at: datetime) -> None:
+        """ See DB.add_session
+        """
+        return await self._run(self._db.add_session, token, user_id,
+                               expires_at)
+
+    async def find_session(self, token: str) -> UserSession:
+        """ See DB.find_session
+        """
+        return await self._run(self._db.find_session, token)
+
+    async def touch_session(self, token: str, expires_at: datetime) -> bool:
+        """ See DB.touch_session
+        """
+        return await self._run(self._db.touch_session, token, expires_at)
+
+    async def delete_session(self, token: str) -> None:
+        """ See DB.delete_session
+        """
+        return await self._run(self._db.delete_session, token)
+
+    async def delete_user_sessions(self, user_id: int) -> List[str]:
+        """ See DB.delete_user_sessions
+        """
+        return await self._run(self._db.delete_user_sessions, user_id)
+
+    def shutdown(self) -> None:
+        """ Stop the workers once the pending calls are done
+        """
+        self._executor.shutdown(wait=True)
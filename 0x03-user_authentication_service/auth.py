@@ -3,19 +3,55 @@
 """
 from bcrypt import hashpw, gensalt, checkpw
 from db import DB
+from hashing import HashingBusy, HashingService
+from metrics import timed
+from session_store import (MemorySessionStore, NullSessionStore,
+                           SessionStore, create_session_store)
+from session_sweeper import SessionSweeper
+from session_token import create_session_tokens
+from datetime import datetime
+from math import floor, log2
+from os import getenv
+from time import perf_counter, time
 from user import User
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
 from uuid import uuid4
 from typing import Union
 
 
+DEFAULT_BCRYPT_ROUNDS = 15
+SESSION_MODE = getenv("AUTH_SESSION_MODE", "db")
+SESSION_TTL = float(getenv("AUTH_SESSION_TTL", "86400"))
+SESSION_REFRESH = float(getenv("AUTH_SESSION_REFRESH", "60"))
+GENERATION_CACHE_TTL = float(getenv("AUTH_SESSION_GENERATION_TTL", "5"))
+_bcrypt_rounds_cache = None
+
+
 class Auth:
     """Auth class to interact with the authentication database.
     """
 
     def __init__(self):
         self._db = DB()
+        self._hasher = HashingService()
+        self.session_store = create_session_store()
+        self.session_tokens = None
+        self.generation_store = None
+        if SESSION_MODE == "signed":
+            self.session_tokens = create_session_tokens()
+            self.generation_store = _create_generation_store(
+                self.session_store)
+        self.session_sweeper = None
+        if SESSION_MODE == "table":
+            self.session_sweeper = SessionSweeper(self._db)
+            self.session_sweeper.start()
+        _bcrypt_rounds()
+
+    def release_db_session(self) -> None:
+        """ Release the database session of the current thread
+        """
+        self._db.remove_session()
 
     def register_user(self, email: str, password: str) -> User:
         """ Register a new user
@@ -26,23 +62,40 @@ class Auth:
 
         Returns:
             User: User object
+
+        Raises:
+            ValueError: the email is already registered
+            HashingBusy: the hashing service is saturated
         """
         try:
             self._db.find_user_by(email=email)
             raise ValueError(f"User {email} already exists")
-        except NoResultFound:
-            if email and password:
-                hashed_password = _hash_password(password)
-                return self._db.add_user(email, hashed_password)
-        except InvalidRequestError:
+        except (NoResultFound, InvalidRequestError):
             if email and password:
-                hashed_password = _hash_password(password)
-                return self._db.add_user(email, hashed_password)
+                hashed_password = self._hasher.run(_hash_password, password)
+                try:
+                    return self._db.add_user(email, hashed_password)
+                except IntegrityError:
+                    # registered concurrently since the lookup
+                    raise ValueError(f"User {email} already exists")
 
     def valid_login(self, email: str, password: str) -> bool:
+        """ Check the credentials of a user; on success, a password hashed
+        with another cost factor than the current one is hashed again
+
+        Args:
+            email (str): email
+            password (str): password
+
+        Returns:
+            bool: True if the credentials are valid
+        """
         try:
             user = self._db.find_user_by(email=email)
-            if checkpw(password.encode("utf-8"), user.hashed_password):
+            if self._hasher.run(_check_password, password,
+                                user.hashed_password):
+                if _hash_rounds(user.hashed_password) != _bcrypt_rounds():
+                    self._rehash_password(user.id, password)
                 return True
             return False
         except NoResultFound:
@@ -50,11 +103,48 @@ class Auth:
         except InvalidRequestError:
             return False
 
+    def _rehash_password(self, user_id: int, password: str) -> None:
+        """ Store the password hashed with the current cost factor; skipped
+        when the hashing service is saturated, the next login will retry
+        """
+        try:
+            hashed_password = self._hasher.run(_hash_password, password)
+        except HashingBusy:
+            return
+        self._db.update_user(user_id, hashed_password=hashed_password)
+
     def create_session(self, email: str) -> str:
+        if self.session_tokens is not None:
+            try:
+                user = self._db.find_user_by(email=email)
+            except (NoResultFound, InvalidRequestError):
+                return None
+            self.generation_store.set(_generation_key(user.id),
+                                      {"generation": user.session_generation})
+            return self.session_tokens.issue(user.id, user.email,
+                                             user.session_generation)
+        if self.session_sweeper is not None:
+            try:
+                user = self._db.find_user_by(email=email)
+            except (NoResultFound, InvalidRequestError):
+                return None
+            session_id = _generate_uuid()
+            expires_at = time() + SESSION_TTL
+            self._db.add_session(session_id, user.id,
+                                 datetime.utcfromtimestamp(expires_at))
+            self.session_store.set(session_id, {
+                "id": user.id, "email": user.email,
+                "expires_at": expires_at})
+            return session_id
         try:
             user = self._db.find_user_by(email=email)
+            old_session_id = user.session_id
             user.session_id = _generate_uuid()
             self._db.update_user(user.id, session_id=user.session_id)
+            if old_session_id:
+                self.session_store.delete(old_session_id)
+            self.session_store.set(user.session_id,
+                                   {"id": user.id, "email": user.email})
             return user.session_id
         except NoResultFound:
             pass
@@ -63,7 +153,13 @@ class Auth:
 
     def get_user_from_session_id(self, session_id: str) -> Union[User, None]:
         """
-        Retrive a user from a session id
+        Retrive a user from a session id, from the session store first:
+        a cached session gives a detached User holding `id` and `email`.
+        In signed mode, the session id is a token verified locally, whose
+        generation must be the current one of the user. In table mode, the
+        session must not be expired; its end is pushed back to
+        AUTH_SESSION_TTL seconds from now (at most every
+        AUTH_SESSION_REFRESH seconds)
 
         Args:
             session_id (str): session id to get a user
@@ -73,23 +169,112 @@ class Auth:
         """
         if not session_id:
             return None
+        if self.session_tokens is not None:
+            claims = self.session_tokens.verify(session_id)
+            if claims is None or claims["generation"] != \
+                    self._session_generation(claims["id"]):
+                return None
+            return User(id=claims["id"], email=claims["email"],
+                        session_id=session_id)
+        if self.session_sweeper is not None:
+            return self._get_table_session(session_id)
+        cached = self.session_store.get(session_id)
+        if cached is not None:
+            return User(id=cached["id"], email=cached["email"],
+                        session_id=session_id)
         try:
-            return self._db.find_user_by(session_id=session_id)
+            user = self._db.find_user_by(session_id=session_id)
+            self.session_store.fill(session_id,
+                                    {"id": user.id, "email": user.email})
+            return user
         except NoResultFound:
             return None
         except InvalidRequestError:
             return None
 
-    def destroy_session(self, user_id: int) -> None:
-        """ updates the corresponding user’s session ID to None
+    def _get_table_session(self, session_id: str) -> Union[User, None]:
+        """ User of a session of the sessions table, from the session store
+        first; an expired cached entry is checked again in the database
+        (another process may have extended it). A cached entry lives at
+        most the TTL of the store, which bounds how long a logout done by
+        another process goes unseen here
+        """
+        now = time()
+        cached = self.session_store.get(session_id)
+        if cached is None or cached["expires_at"] <= now:
+            try:
+                session = self._db.find_session(session_id)
+            except NoResultFound:
+                self.session_store.delete(session_id)
+                return None
+            cached = {"id": session.user_id, "email": session.user.email,
+                      "expires_at": _timestamp(session.expires_at)}
+            if cached["expires_at"] <= now:
+                self.session_store.delete(session_id)
+                return None
+            self.session_store.fill(session_id, cached)
+        if cached["expires_at"] - now < SESSION_TTL - SESSION_REFRESH:
+            cached = dict(cached, expires_at=now + SESSION_TTL)
+            if not self._db.touch_session(
+                    session_id,
+                    datetime.utcfromtimestamp(cached["expires_at"])):
+                self.session_store.delete(session_id)
+                return None
+            self.session_store.fill(session_id, cached)
+        return User(id=cached["id"], email=cached["email"],
+                    session_id=session_id)
+
+    def destroy_session(self, user_id: int, session_id: str = None) -> None:
+        """ updates the corresponding user’s session ID to None; in signed
+        mode, increments the user's session generation instead, which
+        revokes all their tokens; in table mode, deletes the session
+        `session_id`, or all sessions of the user
 
         Args:
             user_id (int): the user primnary key
+            session_id (str): session to end (table mode)
 
         Return:
             None
         """
+        if self.session_sweeper is not None:
+            if session_id:
+                self._db.delete_session(session_id)
+                self.session_store.delete(session_id)
+                return
+            for token in self._db.delete_user_sessions(user_id):
+                self.session_store.delete(token)
+            return
+        if self.session_tokens is not None:
+            self._db.update_user(
+                user_id, session_generation=User.session_generation + 1)
+            self.generation_store.delete(_generation_key(user_id))
+            return
+        try:
+            session_id = self._db.find_user_by(id=user_id).session_id
+        except (NoResultFound, InvalidRequestError):
+            session_id = None
         self._db.update_user(user_id, session_id=None)
+        if session_id:
+            self.session_store.delete(session_id)
+
+    def _session_generation(self, user_id: int) -> Union[int, None]:
+        """ Current session generation of a user, from the generation store
+        first (see `_create_generation_store`)
+
+        Return:
+            (int): generation, or None for an unknown user
+        """
+        cached = self.generation_store.get(_generation_key(user_id))
+        if cached is not None:
+            return cached["generation"]
+        try:
+            generation = self._db.find_user_by(id=user_id).session_generation
+        except (NoResultFound, InvalidRequestError):
+            return None
+        self.generation_store.fill(_generation_key(user_id),
+                                   {"generation": generation})
+        return generation
 
     def get_reset_password_token(self, email: str) -> str:
         try:
@@ -111,13 +296,18 @@ class Auth:
 
         Returns:
             None
+
+        Raises:
+            ValueError: the reset token is not valid
+            HashingBusy: the hashing service is saturated
         """
         if not reset_token or not password:
             raise ValueError
         try:
             user = self._db.find_user_by(reset_token=reset_token)
             self._db.update_user(
-                user.id, hashed_password=_hash_password(password),
+                user.id,
+                hashed_password=self._hasher.run(_hash_password, password),
                 reset_token=None
             )
         except NoResultFound:
@@ -136,8 +326,96 @@ def _generate_uuid() -> str:
     return str(uuid4())
 
 
+def _generation_key(user_id: int) -> str:
+    """ Session store key of the session generation of a user
+    """
+    return "generation:{}".format(user_id)
+
+
+def _create_generation_store(session_store: SessionStore) -> SessionStore:
+    """ Cache of the session generations of signed mode: the session store
+    when it is shared; otherwise a per-process cache whose entries live
+    AUTH_SESSION_GENERATION_TTL seconds (0 disables it), the longest time
+    a token revoked by another worker is still accepted here
+    """
+    if session_store.shared:
+        return session_store
+    if GENERATION_CACHE_TTL <= 0:
+        return NullSessionStore()
+    return MemorySessionStore(
+        max_size=int(getenv("AUTH_SESSION_CACHE_SIZE", "10000")),
+        ttl=GENERATION_CACHE_TTL)
+
+
+def _timestamp(value: datetime) -> float:
+    """ POSIX timestamp of a naive UTC datetime
+    """
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+def _calibrate_rounds(target_ms: float) -> int:
+    """ Highest bcrypt cost factor hashing in less than `target_ms`
+
+    Each extra round doubles the hashing time, so a single measure at a
+    low cost factor is enough to extrapolate.
+
+    Args:
+        target_ms (float): time budget of one hash in milliseconds
+
+    Return:
+        (int): cost factor, between 4 and 31
+    """
+    base_rounds = 8
+    start = perf_counter()
+    hashpw(b"calibration", gensalt(rounds=base_rounds))
+    elapsed_ms = max((perf_counter() - start) * 1000, 1e-3)
+    rounds = base_rounds + floor(log2(target_ms / elapsed_ms))
+    return min(31, max(4, rounds))
+
+
+def _bcrypt_rounds() -> int:
+    """ Current bcrypt cost factor, resolved once: AUTH_BCRYPT_ROUNDS,
+    else calibrated to AUTH_BCRYPT_TARGET_MS, else DEFAULT_BCRYPT_ROUNDS
+
+    Return:
+        (int): cost factor
+    """
+    global _bcrypt_rounds_cache
+    if _bcrypt_rounds_cache is None:
+        if getenv("AUTH_BCRYPT_ROUNDS"):
+            _bcrypt_rounds_cache = int(getenv("AUTH_BCRYPT_ROUNDS"))
+        elif getenv("AUTH_BCRYPT_TARGET_MS"):
+            _bcrypt_rounds_cache = _calibrate_rounds(
+                float(getenv("AUTH_BCRYPT_TARGET_MS")))
+        else:
+            _bcrypt_rounds_cache = DEFAULT_BCRYPT_ROUNDS
+    return _bcrypt_rounds_cache
+
+
+def _hash_rounds(hashed_password: bytes) -> int:
+    """ Cost factor of a bcrypt hash (`$2b$<rounds>$...`)
+
+    Return:
+        (int): cost factor, or None if the hash can't be parsed
+    """
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode("utf-8")
+    try:
+        return int(hashed_password.split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+@timed("hash_password")
 def _hash_password(password: str) -> bytes:
-    """ Hash a password
+    """ Hash a password with the current cost factor
     """
-    salt = gensalt(rounds=15)
+    salt = gensalt(rounds=_bcrypt_rounds())
     return hashpw(password=password.encode("utf-8"), salt=salt)
+
+
+@timed("checkpw")
+def _check_password(password: str, hashed_password: bytes) -> bool:
+    """ Check a password against its hash
+    """
+    return checkpw(password.encode("utf-8"), hashed_password)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+""" Load test of the Flask app (one thread per connection) against the
+ASGI app (one task per connection on a single event loop): throughput of
+concurrent clients logging in (`POST /sessions`) and reading their
+profile (`GET /profile`), in process
+
+    $ python3 -m benchmarks.async_load [concurrency ...]
+"""
+from bcrypt import gensalt, hashpw
+from benchmarks import isolated_cwd
+from threading import Thread
+from time import perf_counter
+from typing import List, Tuple
+import asyncio
+import os
+import sys
+
+
+# stored hashes use the same (cheap) cost factor: no rehash on login
+os.environ.setdefault("AUTH_BCRYPT_ROUNDS", "4")
+PASSWORD = "pwd"
+
+
+def _users(db, clients: int) -> None:
+    """ Add one user per client
+    """
+    rounds = int(os.environ["AUTH_BCRYPT_ROUNDS"])
+    hashed = hashpw(PASSWORD.encode("utf-8"), gensalt(rounds=rounds))
+    db.add_users({"email": "c{}@example.com".format(c),
+                  "hashed_password": hashed} for c in range(clients))
+
+
+def bench_sync(clients: int, rounds: int) -> dict:
+    """ `clients` threads, each with its own Flask test client
+    """
+    with isolated_cwd():
+        import app as app_module
+        from auth import Auth
+        from hashing import HashingService
+
+        app_module.AUTH._hasher.shutdown()
+        app_module.AUTH = Auth()
+        app_module.AUTH._hasher.shutdown()
+        app_module.AUTH._hasher = HashingService(max_pending=clients)
+        _users(app_module.AUTH._db, clients)
+        app_module.AUTH.release_db_session()
+        errors = []
+
+        def worker(c: int):
+            client = app_module.app.test_client()
+            email = "c{}@example.com".format(c)
+            for _ in range(rounds):
+                res = client.post("/sessions", data={"email": email,
+                                                     "password": PASSWORD})
+                if res.status_code != 200:
+                    errors.append(res.status_code)
+                res = client.get("/profile")
+                if res.status_code != 200:
+                    errors.append(res.status_code)
+
+        workers = [Thread(target=worker, args=(c,)) for c in range(clients)]
+        start = perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = perf_counter() - start
+        app_module.AUTH._hasher.shutdown()
+        app_module.AUTH._db._engine.dispose()
+        return {"req_per_s": 2 * clients * rounds / elapsed,
+                "errors": len(errors)}
+
+
+async def asgi_request(app, method: str, path: str,
+                       headers: List[Tuple[str, str]] = (),
+                       body: bytes = b"") -> Tuple[int, dict]:
+    """ Call an ASGI app directly: (status, headers) of the response
+    """
+    scope = {"type": "http", "method": method, "path": path,
+             "query_string": b"",
+             "headers": [(k.lower().encode("latin-1"), v.encode("latin-1"))
+                         for k, v in headers]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    return start["status"], {k.decode(): v.decode()
+                             for k, v in start["headers"]}
+
+
+def bench_async(clients: int, rounds: int) -> dict:
+    """ `clients` tasks on one event loop
+    """
+    with isolated_cwd():
+        import async_app
+        from async_auth import AsyncAuth
+        from hashing import HashingService
+
+        # the service created at import (or by the previous run) is replaced
+        async_app.AUTH.shutdown()
+        async_app.AUTH = AsyncAuth()
+        async_app.AUTH._hasher.shutdown()
+        async_app.AUTH._hasher = HashingService(max_pending=clients)
+        _users(async_app.AUTH._db._db, clients)
+        async_app.AUTH._db._db.remove_session()
+        errors = []
+        form = [("content-type", "application/x-www-form-urlencoded")]
+
+        async def client(c: int):
+            body = "email=c{}%40example.com&password={}".format(
+                c, PASSWORD).encode("utf-8")
+            for _ in range(rounds):
+                status, headers = await asgi_request(
+                    async_app.app, "POST", "/sessions", form, body)
+                if status != 200:
+                    errors.append(status)
+                    continue
+                cookie = headers["set-cookie"].split(";", 1)[0]
+                status, _ = await asgi_request(
+                    async_app.app, "GET", "/profile", [("cookie", cookie)])
+                if status != 200:
+                    errors.append(status)
+
+        async def main():
+            await asyncio.gather(*(client(c) for c in range(clients)))
+
+        start = perf_counter()
+        asyncio.run(main())
+        elapsed = perf_counter() - start
+        async_app.AUTH.shutdown()
+        async_app.AUTH._db._db._engine.dispose()
+        return {"req_per_s": 2 * clients * rounds / elapsed,
+                "errors": len(errors)}
+
+
+if __name__ == "__main__":
+    levels = [int(s) for s in sys.argv[1:]] or [1, 16, 64]
+    rounds = 20
+    print("{:>8} {:>10} {:>10} {:>7}".format(
+        "clients", "app", "req/s", "errors"))
+    for clients in levels:
+        for name, bench in (("flask", bench_sync), ("asgi", bench_async)):
+            res = bench(clients, rounds)
+            print("{:>8} {:>10} {:>10.0f} {:>7}".format(
+                clients, name, res["req_per_s"], res["errors"]))
+            assert res["errors"] == 0
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+""" Insert and update users one transaction at a time against
+`DB.add_users()`/`DB.update_users()`, and time `DB.update_user()`
+
+    $ python3 -m benchmarks.bulk [users ...]
+"""
+from benchmarks import isolated_cwd, measure, summary
+from db import DB
+import sys
+import time
+
+
+def bench(users: int) -> dict:
+    """ Insert then update `users` rows, one by one and in bulk
+    """
+    result = {}
+    with isolated_cwd():
+        db = DB("sqlite:///bench.db", persistent=False)
+        start = time.perf_counter()
+        for i in range(users):
+            db.add_user("u{}@example.com".format(i), "x")
+        result["add_user_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(1, users + 1):
+            user = db.find_user_by(id=i)
+            user.session_id = "s{}".format(i)
+            db._session.commit()
+        result["load_update_s"] = time.perf_counter() - start
+
+        result["update_user"] = summary(measure(
+            lambda i: db.update_user(i % users + 1,
+                                     reset_token="r{}".format(i)), users))
+
+        db = DB("sqlite:///bench.db", persistent=False)
+        start = time.perf_counter()
+        db.add_users({"email": "u{}@example.com".format(i),
+                      "hashed_password": "x"} for i in range(users))
+        result["add_users_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        db.update_users({"id": i, "session_id": "s{}".format(i)}
+                        for i in range(1, users + 1))
+        result["update_users_s"] = time.perf_counter() - start
+    return result
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [1000, 10000]
+    for users in sizes:
+        res = bench(users)
+        print("{:>8} users: add_user x{} {:.2f} s, add_users {:.2f} s".format(
+            users, users, res["add_user_s"], res["add_users_s"]))
+        print("{:>8}        load + update x{} {:.2f} s, update_users "
+              "{:.2f} s".format("", users, res["load_update_s"],
+                                res["update_users_s"]))
+        print("{:>8}        update_user: p50 {:.3f} ms, p99 {:.3f} ms".format(
+            "", res["update_user"]["p50_ms"], res["update_user"]["p99_ms"]))
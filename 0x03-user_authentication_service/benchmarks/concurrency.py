@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+""" Stress test: many threads logging in (`POST /sessions`) and reading
+their profile (`GET /profile`) at the same time
+
+    $ python3 -m benchmarks.concurrency [threads] [rounds]
+"""
+from bcrypt import gensalt, hashpw
+from benchmarks import isolated_cwd
+from threading import Thread
+from time import perf_counter
+import os
+import sys
+
+
+# stored hashes use the same (cheap) cost factor: no rehash on login
+os.environ.setdefault("AUTH_BCRYPT_ROUNDS", "4")
+
+
+def stress(threads: int, rounds: int) -> dict:
+    """ Each thread logs its own user in and checks its profile `rounds`
+    times; every response must be correct
+    """
+    with isolated_cwd():
+        import app as app_module
+        from auth import Auth
+        from hashing import HashingService
+
+        app_module.AUTH = Auth()
+        # every thread may wait on a login hash: no backpressure here
+        app_module.AUTH._hasher = HashingService(max_pending=threads)
+        password = "pwd"
+        cost = int(os.environ["AUTH_BCRYPT_ROUNDS"])
+        hashed = hashpw(password.encode("utf-8"), gensalt(rounds=cost))
+        for t in range(threads):
+            app_module.AUTH._db.add_user("t{}@example.com".format(t), hashed)
+        app_module.AUTH.release_db_session()
+        errors = []
+
+        def worker(t: int):
+            client = app_module.app.test_client()
+            email = "t{}@example.com".format(t)
+            for _ in range(rounds):
+                res = client.post("/sessions", data={"email": email,
+                                                     "password": password})
+                if res.status_code != 200:
+                    errors.append(("login", email, res.status_code))
+                    continue
+                res = client.get("/profile")
+                if res.status_code != 200 or res.json["email"] != email:
+                    errors.append(("profile", email, res.status_code))
+
+        workers = [Thread(target=worker, args=(t,)) for t in range(threads)]
+        start = perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = perf_counter() - start
+        app_module.AUTH._db._engine.dispose()
+        return {"requests": 2 * threads * rounds, "errors": errors,
+                "req_per_s": 2 * threads * rounds / elapsed}
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    res = stress(threads, rounds)
+    print("{} requests, {:.0f} req/s, {} errors".format(
+        res["requests"], res["req_per_s"], len(res["errors"])))
+    assert len(res["errors"]) == 0, res["errors"][:10]
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+""" Latency of `GET /profile` against the number of users, with and
+without the index on `users.session_id`
+
+    $ python3 -m benchmarks.profile [users ...]
+"""
+from benchmarks import isolated_cwd, measure, populate, summary
+import random
+import sys
+
+
+def bench(users: int, indexed: bool, n: int = 200) -> dict:
+    """ Request the profile of `n` random users out of `users`
+    """
+    with isolated_cwd():
+        import app as app_module
+        from auth import Auth
+
+        app_module.AUTH = Auth()
+        engine = app_module.AUTH._db._engine
+        populate(engine, users)
+        if not indexed:
+            engine.execute("DROP INDEX ix_users_session_id")
+        client = app_module.app.test_client(use_cookies=False)
+        ids = [random.randrange(users) for _ in range(n)]
+
+        def profile(i: int):
+            cookie = "session_id=s{}".format(ids[i])
+            res = client.get("/profile", headers={"Cookie": cookie})
+            assert res.status_code == 200
+
+        result = summary(measure(profile, n))
+        engine.dispose()
+        return result
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [10000, 100000]
+    for users in sizes:
+        for indexed in (False, True):
+            res = bench(users, indexed)
+            print("{:>8} users, {:>9}: p50 {:.3f} ms, p99 {:.3f} ms".format(
+                users, "indexed" if indexed else "scan",
+                res["p50_ms"], res["p99_ms"]))
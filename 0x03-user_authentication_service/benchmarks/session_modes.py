@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+""" Throughput of `GET /profile` with database sessions (without and with
+the session cache) and with signed session tokens (with the per-process
+generation cache, and with the generation read from the database on each
+request), once the sessions requested have been seen (steady state, as
+after the logins)
+
+    $ python3 -m benchmarks.session_modes [users ...]
+"""
+from benchmarks import isolated_cwd, measure, populate, summary
+import random
+import sys
+
+
+MODES = ("db", "db+cache", "signed", "signed+db")
+
+
+def bench(users: int, mode: str, n: int = 2000) -> dict:
+    """ Request the profile of `n` random users out of `users`
+    """
+    with isolated_cwd():
+        import app as app_module
+        from auth import Auth
+        from session_store import MemorySessionStore, NullSessionStore
+        from session_token import SessionTokens
+
+        auth = app_module.AUTH = Auth()
+        auth.session_tokens = None
+        auth.session_store = MemorySessionStore()
+        if mode == "db":
+            auth.session_store = NullSessionStore()
+        if mode.startswith("signed"):
+            auth.session_tokens = SessionTokens()
+            auth.generation_store = MemorySessionStore()
+            if mode == "signed+db":
+                auth.generation_store = NullSessionStore()
+        populate(auth._db._engine, users)
+        if mode.startswith("signed"):
+            # user i has the id i + 1 and the generation 0
+            cookies = ["session_id=" + auth.session_tokens.issue(
+                i + 1, "u{}@example.com".format(i), 0) for i in range(users)]
+        else:
+            cookies = ["session_id=s{}".format(i) for i in range(users)]
+        client = app_module.app.test_client(use_cookies=False)
+        ids = [random.randrange(users) for _ in range(n)]
+
+        def profile(i: int):
+            res = client.get("/profile", headers={"Cookie": cookies[ids[i]]})
+            assert res.status_code == 200
+
+        # warm up: each session requested once, as by a login
+        measure(profile, n)
+        result = summary(measure(profile, n))
+        lookup = summary(measure(
+            lambda i: auth.get_user_from_session_id(
+                cookies[ids[i]].split("=", 1)[1]), n))
+        result["lookup_p50_us"] = lookup["p50_ms"] * 1000
+        auth.release_db_session()
+        auth._db._engine.dispose()
+        return result
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [10000, 100000]
+    print("{:>8} {:>9} {:>9} {:>9} {:>9} {:>12}".format(
+        "users", "mode", "p50 ms", "p99 ms", "req/s", "lookup us"))
+    for users in sizes:
+        for mode in MODES:
+            res = bench(users, mode)
+            print("{:>8} {:>9} {:>9.3f} {:>9.3f} {:>9.0f} {:>12.1f}".format(
+                users, mode, res["p50_ms"], res["p99_ms"], res["ops_per_s"],
+                res["lookup_p50_us"]))
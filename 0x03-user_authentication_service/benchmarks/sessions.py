@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+""" Sweep of the expired rows of the sessions table (AUTH_SESSION_MODE=table)
+by batches vs in a single transaction: duration of the sweep and latency of
+`GET /profile` (session cache off) served meanwhile
+
+    $ python3 -m benchmarks.sessions [expired ...]
+"""
+from benchmarks import isolated_cwd, populate, summary
+from datetime import datetime, timedelta
+from threading import Event, Thread
+from time import perf_counter
+import random
+import sys
+
+
+USERS = 1000
+SESSIONS_PER_USER = 3
+
+
+def bench(expired: int, batch_size: int = None) -> dict:
+    """ Sweep `expired` expired sessions, by batches of `batch_size` rows
+    (all in one transaction if None), while profiles are requested
+    """
+    with isolated_cwd():
+        import app as app_module
+        from auth import Auth
+        from session_store import NullSessionStore
+        from session_sweeper import SessionSweeper
+        from user import UserSession
+
+        # the sweepers started by Auth() (table mode) are replaced
+        for previous in (app_module.AUTH, Auth()):
+            if previous.session_sweeper is not None:
+                previous.session_sweeper.stop()
+        auth = app_module.AUTH = previous
+        auth.session_store = NullSessionStore()
+        auth.session_sweeper = SessionSweeper(
+            auth._db, batch_size=batch_size or expired)
+        populate(auth._db._engine, USERS)
+        engine = auth._db._engine
+        valid = datetime.utcnow() + timedelta(days=1)
+        tokens = ["t{}-{}".format(i, j) for i in range(USERS)
+                  for j in range(SESSIONS_PER_USER)]
+        engine.execute(UserSession.__table__.insert(), [
+            {"token": token, "user_id": i // SESSIONS_PER_USER + 1,
+             "expires_at": valid} for i, token in enumerate(tokens)])
+        past = datetime.utcnow() - timedelta(hours=1)
+        for start in range(0, expired, 10000):
+            engine.execute(UserSession.__table__.insert(), [
+                {"token": "x{}".format(i), "user_id": i % USERS + 1,
+                 "expires_at": past}
+                for i in range(start, min(expired, start + 10000))])
+
+        client = app_module.app.test_client(use_cookies=False)
+        latencies = []
+        done = Event()
+
+        def requests():
+            while not done.is_set():
+                token = random.choice(tokens)
+                start = perf_counter()
+                res = client.get("/profile",
+                                 headers={"Cookie": "session_id=" + token})
+                latencies.append(perf_counter() - start)
+                assert res.status_code == 200
+
+        thread = Thread(target=requests)
+        thread.start()
+        start = perf_counter()
+        deleted = auth.session_sweeper.sweep()
+        seconds = perf_counter() - start
+        done.set()
+        thread.join()
+        assert deleted == expired
+        result = summary(latencies)
+        result["sweep_s"] = seconds
+        auth.release_db_session()
+        engine.dispose()
+        return result
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [10000, 100000]
+    print("{:>8} {:>7} {:>9} {:>9} {:>9} {:>9}".format(
+        "expired", "batch", "sweep s", "requests", "p50 ms", "p99 ms"))
+    for expired in sizes:
+        for batch_size in (None, 500):
+            res = bench(expired, batch_size)
+            print("{:>8} {:>7} {:>9.3f} {:>9} {:>9.3f} {:>9.3f}".format(
+                expired, batch_size or "all", res["sweep_s"], res["n"],
+                res["p50_ms"], res["p99_ms"]))
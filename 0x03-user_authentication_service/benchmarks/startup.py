@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+""" Time to construct `DB()` on an existing database, dropping the schema
+(default) or keeping it (persistent mode)
+
+    $ python3 -m benchmarks.startup [users ...]
+"""
+from benchmarks import isolated_cwd, measure, populate, summary
+from db import DB
+import sys
+
+
+def bench(users: int, persistent: bool, n: int = 5) -> dict:
+    """ Construct `n` DB instances on a database holding `users` rows
+    """
+    with isolated_cwd():
+        url = "sqlite:///bench.db"
+        latencies = []
+        for i in range(n):
+            populate(DB(url, persistent=False)._engine, users)
+            latencies += measure(
+                lambda i: DB(url, persistent=persistent)._engine.dispose(), 1)
+        return summary(latencies)
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [1000, 100000]
+    for users in sizes:
+        for persistent in (False, True):
+            res = bench(users, persistent)
+            print("{:>8} users, {:>10}: p50 {:.2f} ms".format(
+                users, "persistent" if persistent else "reset",
+                res["p50_ms"]))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+""" Offline benchmark suite of the service: registration, login, profile,
+logout and password reset through the Flask test client, at several
+database sizes
+
+    $ python3 -m benchmarks.suite [--sizes 100,1000,10000] [-n 100]
+          [--output report.json] [--compare baseline.json]
+
+Prints p50/p95/p99 latency and throughput of each scenario, writes them
+as JSON with `--output`, and with `--compare` exits with status 1 when a
+p95 latency regressed by more than `--tolerance` against a previous
+report.
+"""
+from bcrypt import gensalt, hashpw
+from benchmarks import compare, isolated_cwd, measure, summary, write_report
+from typing import List
+import argparse
+import os
+import sys
+
+
+# stored hashes use the same (cheap) cost factor: no rehash on login
+os.environ.setdefault("AUTH_BCRYPT_ROUNDS", "4")
+PASSWORD = "pwd"
+
+
+def _cookie(response) -> str:
+    """ `session_id` cookie set by a response
+    """
+    for header in response.headers.getlist("Set-Cookie"):
+        if header.startswith("session_id="):
+            return header.split(";", 1)[0]
+    return None
+
+
+def bench(users: int, n: int) -> List[dict]:
+    """ Run each scenario `n` times (at most `users`) on a database holding
+    `users` users
+    """
+    with isolated_cwd():
+        import app as app_module
+        from auth import Auth
+        from hashing import HashingService
+
+        app_module.AUTH = Auth()
+        app_module.AUTH._hasher = HashingService(max_pending=n)
+        rounds = int(os.environ["AUTH_BCRYPT_ROUNDS"])
+        hashed = hashpw(PASSWORD.encode("utf-8"), gensalt(rounds=rounds))
+        app_module.AUTH._db.add_users(
+            {"email": "u{}@example.com".format(i), "hashed_password": hashed}
+            for i in range(users))
+        app_module.AUTH.release_db_session()
+        client = app_module.app.test_client(use_cookies=False)
+        n = min(n, users)
+        cookies = [None] * n
+        tokens = [None] * n
+
+        def check(response, status: int = 200):
+            assert response.status_code == status, response.status_code
+            return response
+
+        def register(i: int):
+            check(client.post("/users", data={
+                "email": "new{}@example.com".format(i),
+                "password": PASSWORD}))
+
+        def login(i: int):
+            cookies[i] = _cookie(check(client.post("/sessions", data={
+                "email": "u{}@example.com".format(i),
+                "password": PASSWORD})))
+
+        def profile(i: int):
+            check(client.get("/profile", headers={"Cookie": cookies[i]}))
+
+        def logout(i: int):
+            check(client.delete("/sessions",
+                                headers={"Cookie": cookies[i]}), 302)
+
+        def reset_token(i: int):
+            tokens[i] = check(client.post("/reset_password", data={
+                "email": "u{}@example.com".format(i)})).json["reset_token"]
+
+        def update_password(i: int):
+            check(client.put("/reset_password", data={
+                "email": "u{}@example.com".format(i),
+                "reset_token": tokens[i], "new_password": PASSWORD}))
+
+        results = []
+        for scenario in (register, login, profile, logout, reset_token,
+                         update_password):
+            result = {"scenario": scenario.__name__, "users": users}
+            result.update(summary(measure(scenario, n)))
+            results.append(result)
+        app_module.AUTH._db._engine.dispose()
+        return results
+
+
+def main(argv: List[str] = None) -> int:
+    """ Run the suite, print and save the report; 1 on regressions
+    """
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks.suite")
+    parser.add_argument("--sizes", default="100,1000,10000",
+                        help="comma separated numbers of users")
+    parser.add_argument("-n", type=int, default=100,
+                        help="requests per scenario")
+    parser.add_argument("--output", help="write the JSON report there")
+    parser.add_argument("--compare", help="JSON report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed p95 growth against --compare")
+    args = parser.parse_args(argv)
+
+    results = []
+    print("{:>16} {:>8} {:>9} {:>9} {:>9} {:>10}".format(
+        "scenario", "users", "p50 ms", "p95 ms", "p99 ms", "req/s"))
+    for users in (int(s) for s in args.sizes.split(",")):
+        for result in bench(users, args.n):
+            results.append(result)
+            print("{:>16} {:>8} {:>9.3f} {:>9.3f} {:>9.3f} {:>10.0f}".format(
+                result["scenario"], users, result["p50_ms"],
+                result["p95_ms"], result["p99_ms"], result["ops_per_s"]))
+    write_report(results, args.output)
+    if args.compare is not None:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print("regression: {}".format(regression))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
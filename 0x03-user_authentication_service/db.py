@@ -1,38 +1,166 @@
 #!/usr/bin/env python3
 """DB module
 """
-from sqlalchemy import create_engine
+from os import getenv
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import QueuePool
+from datetime import datetime
+from typing import Dict, Iterable, List
 
 
+from metrics import timed
 from user import Base
-from user import User
-from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.exc import InvalidRequestError
+from user import User, UserSession
+from sqlalchemy.orm.exc import NoResultFound, StaleDataError
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+
+
+DB_URL = getenv("AUTH_DB_URL", "sqlite:///a.db")
+DB_PERSISTENT = getenv("AUTH_DB_PERSISTENT", "0") == "1"
+SQLITE_MMAP_SIZE = int(getenv("AUTH_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT = int(getenv("AUTH_DB_BUSY_TIMEOUT", "5000"))
+DB_POOL_SIZE = int(getenv("AUTH_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(getenv("AUTH_DB_MAX_OVERFLOW", "10"))
+DB_BATCH_SIZE = int(getenv("AUTH_DB_BATCH_SIZE", "1000"))
+SWEEP_BATCH_SIZE = int(getenv("AUTH_SESSION_SWEEP_BATCH", "500"))
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """ Tune each new SQLite connection for concurrent readers
+
+    Args:
+        dbapi_connection: raw sqlite3 connection
+        connection_record: pool record of the connection
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA mmap_size={:d}".format(SQLITE_MMAP_SIZE))
+    cursor.execute("PRAGMA busy_timeout={:d}".format(SQLITE_BUSY_TIMEOUT))
+    cursor.close()
+
+
+def _pool_options(db_url: str, pool_size: int, max_overflow: int) -> dict:
+    """ Connection pool arguments of `create_engine` for a database URL
+
+    File based SQLite gets a QueuePool shared by all threads instead of the
+    default NullPool, which opens (and tunes) a connection per checkout.
+    In-memory SQLite keeps its single-connection default pool.
+    """
+    url = make_url(db_url)
+    if url.get_backend_name() != "sqlite":
+        return {"pool_size": pool_size, "max_overflow": max_overflow}
+    if url.database in (None, "", ":memory:"):
+        return {}
+    return {"poolclass": QueuePool, "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "connect_args": {"check_same_thread": False}}
+
+
+def _batches(rows: Iterable[Dict], batch_size: int) -> Iterable[List[Dict]]:
+    """ Split `rows` in lists of at most `batch_size` rows
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _check_attributes(attributes: Iterable[str]) -> None:
+    """ Raise ValueError if one of `attributes` is not a column of User
+    """
+    columns = User.__table__.columns
+    for attribute in attributes:
+        if attribute not in columns:
+            raise ValueError("Invalid attribute: {}".format(attribute))
 
 
 class DB:
     """ DB class
     """
 
-    def __init__(self) -> None:
+    def __init__(self, db_url: str = None, persistent: bool = None,
+                 pool_size: int = None, max_overflow: int = None) -> None:
         """ Initialize a new DB instance
+
+        Args:
+            db_url (str): database URL, defaults to AUTH_DB_URL
+            persistent (bool): keep the existing tables and rows instead of
+                dropping them, defaults to AUTH_DB_PERSISTENT
+            pool_size (int): connections kept open, defaults to
+                AUTH_DB_POOL_SIZE
+            max_overflow (int): extra connections opened under load,
+                defaults to AUTH_DB_MAX_OVERFLOW
+        """
+        if db_url is None:
+            db_url = DB_URL
+        if persistent is None:
+            persistent = DB_PERSISTENT
+        if pool_size is None:
+            pool_size = DB_POOL_SIZE
+        if max_overflow is None:
+            max_overflow = DB_MAX_OVERFLOW
+        self._engine = create_engine(
+            db_url, echo=False,
+            **_pool_options(db_url, pool_size, max_overflow))
+        if self._engine.dialect.name == "sqlite":
+            event.listen(self._engine, "connect", _set_sqlite_pragmas)
+        if not persistent:
+            Base.metadata.drop_all(self._engine)
+        Base.metadata.create_all(self._engine, checkfirst=True)
+        self._migrate()
+        self.__session = scoped_session(sessionmaker(bind=self._engine))
+
+    def _migrate(self) -> None:
+        """ Bring the schema of an existing database up to date: add the
+        columns and create the indexes declared on the models but missing
+        from the tables
+
+        Raises:
+            IntegrityError: a unique index can't be created because of
+                duplicated values, which must be cleaned up first
         """
-        self._engine = create_engine("sqlite:///a.db", echo=False)
-        Base.metadata.drop_all(self._engine)
-        Base.metadata.create_all(self._engine)
-        self.__session = None
+        inspector = inspect(self._engine)
+        quote = self._engine.dialect.identifier_preparer.quote
+        for table in Base.metadata.sorted_tables:
+            existing = {col["name"] for col in inspector.get_columns(
+                table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = "ALTER TABLE {} ADD COLUMN {} {}".format(
+                    quote(table.name), quote(column.name),
+                    column.type.compile(dialect=self._engine.dialect))
+                if column.server_default is not None:
+                    ddl += " DEFAULT {}".format(column.server_default.arg)
+                if not column.nullable:
+                    ddl += " NOT NULL"
+                self._engine.execute(ddl)
+            existing = {idx["name"] for idx in inspector.get_indexes(
+                table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=self._engine)
 
     @property
     def _session(self) -> Session:
-        """ Memoized session object
+        """ Session object of the current thread
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """ Close the session of the current thread and give its connection
+        back to the pool, e.g. at the end of a request
+        """
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """ Add a new user to the database
@@ -43,16 +171,55 @@ class DB:
 
         Returns:
             User: User object
+
+        Raises:
+            IntegrityError: the email is already registered (rolled back)
         """
         user = User()
         user.email = email
         user.hashed_password = hashed_password
 
         self._session.add(user)
-        self._session.commit()
+        try:
+            self._session.commit()
+        except IntegrityError:
+            self._session.rollback()
+            raise
 
         return user
 
+    def add_users(self, users: Iterable[Dict],
+                  batch_size: int = None) -> int:
+        """ Add many users in a single transaction, inserted by batches
+
+        Args:
+            users: dictionaries of User attributes (at least `email` and
+                `hashed_password`), consumed one batch at a time
+            batch_size (int): rows per INSERT, defaults to AUTH_DB_BATCH_SIZE
+
+        Returns:
+            int: number of users added
+
+        Raises:
+            ValueError: an attribute is not a User column; nothing is added
+            IntegrityError: e.g. a duplicated email; nothing is added
+        """
+        if batch_size is None:
+            batch_size = DB_BATCH_SIZE
+        count = 0
+        try:
+            for batch in _batches(users, batch_size):
+                for row in batch:
+                    _check_attributes(row)
+                self._session.bulk_insert_mappings(User, batch)
+                count += len(batch)
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
+        return count
+
+    @timed("find_user_by")
     def find_user_by(self, *args, **kwargs) -> User:
         """ Find a user by a given attribute
 
@@ -74,7 +241,7 @@ class DB:
             raise InvalidRequestError("InvalidRequestError")
 
     def update_user(self, user_id: int, **kwargs) -> None:
-        """ Update a user
+        """ Update a user with a single UPDATE, without loading it
 
         Args:
             user_id (int): user id
@@ -82,17 +249,150 @@ class DB:
 
         Returns:
             None
+
+        Raises:
+            ValueError: no user `user_id`, or an attribute is not a User
+                column
         """
+        _check_attributes(kwargs)
+        if not kwargs:
+            try:
+                self.find_user_by(id=user_id)
+            except NoResultFound:
+                raise ValueError
+            return None
         try:
-            user = self.find_user_by(id=user_id)
-            for i, j in kwargs.items():
-                if not hasattr(user, i):
-                    raise ValueError
-                else:
-                    setattr(user, i, j)
+            updated = self._session.query(User).filter_by(
+                id=user_id).update(kwargs, synchronize_session=False)
             self._session.commit()
-        except NoResultFound:
-            raise ValueError
-        except InvalidRequestError:
+        except Exception:
+            self._session.rollback()
+            raise
+        if updated == 0:
             raise ValueError
         return None
+
+    def update_users(self, updates: Iterable[Dict],
+                     batch_size: int = None) -> int:
+        """ Update many users in a single transaction, by batches
+
+        Args:
+            updates: dictionaries holding the `id` of a user and the
+                attributes to set
+            batch_size (int): rows per batch, defaults to AUTH_DB_BATCH_SIZE
+
+        Returns:
+            int: number of users updated
+
+        Raises:
+            ValueError: an update has no `id`, an id matches no user or an
+                attribute is not a User column; nothing is updated
+        """
+        if batch_size is None:
+            batch_size = DB_BATCH_SIZE
+        count = 0
+        try:
+            for batch in _batches(updates, batch_size):
+                for row in batch:
+                    if "id" not in row:
+                        raise ValueError("Missing id")
+                    _check_attributes(row)
+                self._session.bulk_update_mappings(User, batch)
+                count += len(batch)
+            self._session.commit()
+        except StaleDataError:
+            self._session.rollback()
+            raise ValueError("Unknown user id")
+        except Exception:
+            self._session.rollback()
+            raise
+        return count
+
+    def add_session(self, token: str, user_id: int,
+                    expires_at: datetime) -> None:
+        """ Add a session of a user
+
+        Args:
+            token (str): session token
+            user_id (int): user id
+            expires_at (datetime): end of the session (UTC)
+        """
+        self._session.add(UserSession(token=token, user_id=user_id,
+                                      expires_at=expires_at))
+        self._session.commit()
+
+    def find_session(self, token: str) -> UserSession:
+        """ Session of a token, with its user loaded by the same query
+
+        Raises:
+            NoResultFound: no session has this token
+        """
+        result = self._session.query(UserSession).filter_by(
+            token=token).first()
+        if result is None:
+            raise NoResultFound("NoResultFound")
+        return result
+
+    def touch_session(self, token: str, expires_at: datetime) -> bool:
+        """ Move the end of a session to `expires_at` (sliding expiry)
+
+        Returns:
+            bool: False if the session doesn't exist (anymore)
+        """
+        updated = self._session.query(UserSession).filter_by(
+            token=token).update({"expires_at": expires_at},
+                                synchronize_session=False)
+        self._session.commit()
+        return updated > 0
+
+    def delete_session(self, token: str) -> None:
+        """ Delete the session of a token
+        """
+        self._session.query(UserSession).filter_by(token=token).delete(
+            synchronize_session=False)
+        self._session.commit()
+
+    def delete_user_sessions(self, user_id: int) -> List[str]:
+        """ Delete all sessions of a user
+
+        Returns:
+            list: tokens of the deleted sessions
+        """
+        query = self._session.query(UserSession).filter_by(user_id=user_id)
+        tokens = [token for (token,) in query.with_entities(
+            UserSession.token)]
+        query.delete(synchronize_session=False)
+        self._session.commit()
+        return tokens
+
+    def delete_expired_sessions(self, now: datetime = None,
+                                batch_size: int = None) -> int:
+        """ Delete the sessions expired at `now`, by batches of
+        `batch_size` rows, each batch in its own short transaction so that
+        requests are not locked out while a large backlog is swept
+
+        Args:
+            now (datetime): defaults to the current UTC time
+            batch_size (int): defaults to AUTH_SESSION_SWEEP_BATCH
+
+        Returns:
+            int: number of sessions deleted
+        """
+        if now is None:
+            now = datetime.utcnow()
+        if batch_size is None:
+            batch_size = SWEEP_BATCH_SIZE
+        deleted = 0
+        while True:
+            ids = [session_id for (session_id,) in self._session.query(
+                UserSession.id).filter(UserSession.expires_at < now).limit(
+                batch_size)]
+            if not ids:
+                break
+            self._session.query(UserSession).filter(
+                UserSession.id.in_(ids)).delete(synchronize_session=False)
+            self._session.commit()
+            deleted += len(ids)
+            if len(ids) < batch_size:
+                break
+        return deleted
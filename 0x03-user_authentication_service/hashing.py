@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+""" Hashing module
+"""
+from concurrent.futures import ThreadPoolExecutor
+from metrics import Collected, Registry
+from os import cpu_count, getenv
+from threading import BoundedSemaphore, Lock
+from time import perf_counter
+from typing import Any, Callable
+import asyncio
+
+
+class HashingBusy(Exception):
+    """ Raised when the hashing service already has too many pending jobs
+    """
+
+
+class HashingService:
+    """ Run password hashing jobs (bcrypt) on a pool of worker threads
+
+    bcrypt releases the GIL while hashing, so workers run in parallel and
+    request threads only wait for their own job. At most `max_pending`
+    jobs are accepted at once (running + queued); beyond that `run` raises
+    HashingBusy instead of letting the queue grow.
+    """
+
+    def __init__(self, workers: int = None, max_pending: int = None) -> None:
+        """ Initialize a new HashingService
+
+        Args:
+            workers (int): worker threads, defaults to AUTH_HASH_WORKERS or
+                the number of CPUs
+            max_pending (int): accepted jobs, defaults to AUTH_HASH_QUEUE or
+                4 jobs per worker
+        """
+        if workers is None:
+            workers = int(getenv("AUTH_HASH_WORKERS", str(cpu_count() or 1)))
+        if max_pending is None:
+            max_pending = int(getenv("AUTH_HASH_QUEUE", str(4 * workers)))
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="hashing")
+        self._slots = BoundedSemaphore(max_pending)
+        self._lock = Lock()
+        self._stats = {"submitted": 0, "completed": 0, "rejected": 0,
+                       "in_flight": 0, "wait_seconds": 0.0,
+                       "run_seconds": 0.0}
+
+    def run(self, fn: Callable, *args) -> Any:
+        """ Run `fn(*args)` on a worker and wait for its result
+
+        Raises:
+            HashingBusy: `max_pending` jobs are already accepted
+        """
+        submitted_at = self._admit()
+        try:
+            return self._executor.submit(
+                self._job, submitted_at, fn, *args).result()
+        finally:
+            self._release()
+
+    async def run_async(self, fn: Callable, *args) -> Any:
+        """ Coroutine version of `run`: the event loop goes on while the
+        job runs on a worker
+
+        The slot is given back when the job is done, not when the awaiting
+        coroutine is: a cancelled client doesn't free the slot of a job
+        still running.
+
+        Raises:
+            HashingBusy: `max_pending` jobs are already accepted
+        """
+        submitted_at = self._admit()
+        try:
+            future = self._executor.submit(self._job, submitted_at, fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def _admit(self) -> float:
+        """ Take a slot for one job and return its submission time
+
+        Raises:
+            HashingBusy: no slot is left
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise HashingBusy("Too many pending hashing jobs")
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["in_flight"] += 1
+        return perf_counter()
+
+    def _release(self) -> None:
+        """ Give back the slot of a finished job
+        """
+        self._slots.release()
+        with self._lock:
+            self._stats["in_flight"] -= 1
+
+    def _job(self, submitted_at: float, fn: Callable, *args) -> Any:
+        """ Worker side of `run`: time the job and count it
+        """
+        started_at = perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            ended_at = perf_counter()
+            with self._lock:
+                self._stats["completed"] += 1
+                self._stats["wait_seconds"] += started_at - submitted_at
+                self._stats["run_seconds"] += ended_at - started_at
+
+    def stats(self) -> dict:
+        """ Counters of the service: jobs submitted, completed, rejected
+        and in flight, total seconds waited in queue and spent hashing
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self) -> None:
+        """ Stop the workers once the pending jobs are done
+        """
+        self._executor.shutdown(wait=True)
+
+
+def register_metrics(registry: Registry,
+                     service: Callable[[], HashingService]) -> None:
+    """ Expose the counters of the hashing service returned by `service()`
+    (read at each render) in `registry`
+    """
+    def jobs() -> dict:
+        stats = service().stats()
+        return {(state,): stats[state]
+                for state in ("submitted", "completed", "rejected")}
+
+    def seconds() -> dict:
+        stats = service().stats()
+        return {("wait",): stats["wait_seconds"],
+                ("run",): stats["run_seconds"]}
+
+    registry.register(Collected(
+        "hashing_jobs_total", "Hashing jobs by state", "counter",
+        ("state",), jobs))
+    registry.register(Collected(
+        "hashing_jobs_in_flight", "Hashing jobs accepted and not finished",
+        "gauge", (), lambda: {(): service().stats()["in_flight"]}))
+    registry.register(Collected(
+        "hashing_seconds_total", "Seconds hashing jobs waited in queue and "
+        "ran", "counter", ("phase",), seconds))
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+""" Session store module
+"""
+from collections import OrderedDict
+from os import getenv
+from threading import Lock
+from time import monotonic
+from typing import Union
+import json
+
+
+class SessionStore:
+    """ Cache of sessions in front of the database: maps a session ID to a
+    snapshot of its user (`{"id": ..., "email": ...}`)
+
+    Subclasses implement `_get`, `set`, `fill` and `delete`; `get` counts
+    hits and misses for monitoring. A `shared` store is seen by all the
+    workers, so its deletions take effect everywhere at once.
+    """
+    shared = False
+
+    def __init__(self) -> None:
+        """ Initialize the hit/miss counters
+        """
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = Lock()
+
+    def get(self, session_id: str) -> Union[dict, None]:
+        """ Cached user snapshot of a session
+
+        Args:
+            session_id (str): session ID
+
+        Returns:
+            the user snapshot or None
+        """
+        user = self._get(session_id)
+        with self._stats_lock:
+            if user is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return user
+
+    def _get(self, session_id: str) -> Union[dict, None]:
+        """ Lookup without counting
+        """
+        raise NotImplementedError
+
+    def set(self, session_id: str, user: dict) -> None:
+        """ Cache the user snapshot of a session
+        """
+        raise NotImplementedError
+
+    def fill(self, session_id: str, user: dict) -> None:
+        """ Cache a user snapshot read from the database, unless the session
+        was deleted since (the read may predate the deletion)
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        """ Forget a session; `fill` ignores it for a while
+        """
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """ Hits, misses and hit rate of the store
+        """
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {"hits": hits, "misses": misses,
+                "hit_rate": hits / total if total else 0.0}
+
+
+class NullSessionStore(SessionStore):
+    """ No cache: every lookup goes to the database
+    """
+
+    def _get(self, session_id: str) -> Union[dict, None]:
+        """ Always a miss
+        """
+        return None
+
+    def set(self, session_id: str, user: dict) -> None:
+        """ Nothing to cache
+        """
+
+    def fill(self, session_id: str, user: dict) -> None:
+        """ Nothing to cache
+        """
+
+    def delete(self, session_id: str) -> None:
+        """ Nothing to forget
+        """
+
+
+class MemorySessionStore(SessionStore):
+    """ In-process LRU session store with a TTL
+
+    Other processes don't see its deletions: a session destroyed elsewhere
+    stays valid here until its entry expires, so keep the TTL short when
+    several workers serve the application.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 5) -> None:
+        """ Initialize a new MemorySessionStore
+
+        Args:
+            max_size (int): sessions kept, the least recently used is
+                evicted first
+            ttl (float): lifetime of a cached session in seconds
+        """
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def _get(self, session_id: str) -> Union[dict, None]:
+        """ Lookup without counting, dropping an expired entry
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[1] < monotonic():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return entry[0]
+
+    def _put(self, session_id: str, user: Union[dict, None]) -> None:
+        """ Store an entry (None: deleted), evicting the least recently
+        used ones; the lock is held
+        """
+        self._entries[session_id] = (user, monotonic() + self.ttl)
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def set(self, session_id: str, user: dict) -> None:
+        """ Cache the user snapshot of a session
+        """
+        with self._lock:
+            self._put(session_id, user)
+
+    def fill(self, session_id: str, user: dict) -> None:
+        """ Cache a user snapshot read from the database, unless the session
+        was deleted since
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[0] is not None or \
+                    entry[1] < monotonic():
+                self._put(session_id, user)
+
+    def delete(self, session_id: str) -> None:
+        """ Forget a session, keeping a deleted entry for `ttl` seconds
+        """
+        with self._lock:
+            self._put(session_id, None)
+
+    def stats(self) -> dict:
+        """ Hits, misses, hit rate and size of the store
+        """
+        result = super().stats()
+        result["size"] = len(self._entries)
+        return result
+
+
+class RedisSessionStore(SessionStore):
+    """ Session store on any client with the redis-py `get`, `set(ex=)`
+    and `delete` methods (Redis, or a local compatible stand-in)
+
+    Deletions leave a `<prefix>deleted:<id>` marker for `ttl` seconds,
+    checked by `fill`.
+    """
+    shared = True
+
+    def __init__(self, client, ttl: float = 300,
+                 prefix: str = "session:") -> None:
+        """ Initialize a new RedisSessionStore
+
+        Args:
+            client: redis-py compatible client
+            ttl (float): lifetime of a cached session in seconds
+            prefix (str): prefix of the keys
+        """
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _get(self, session_id: str) -> Union[dict, None]:
+        """ Lookup without counting
+        """
+        value = self.client.get(self.prefix + session_id)
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def set(self, session_id: str, user: dict) -> None:
+        """ Cache the user snapshot of a session
+        """
+        self.client.set(self.prefix + session_id, json.dumps(user),
+                        ex=max(1, int(self.ttl)))
+
+    def fill(self, session_id: str, user: dict) -> None:
+        """ Cache a user snapshot read from the database, unless the session
+        was deleted since
+        """
+        if self.client.get(self.prefix + "deleted:" + session_id) is None:
+            self.set(session_id, user)
+
+    def delete(self, session_id: str) -> None:
+        """ Forget a session
+        """
+        self.client.set(self.prefix + "deleted:" + session_id, "1",
+                        ex=max(1, int(self.ttl)))
+        self.client.delete(self.prefix + session_id)
+
+
+def create_session_store() -> SessionStore:
+    """ Session store configured by AUTH_SESSION_STORE: `none` (default,
+    no cache), `memory` (per process, AUTH_SESSION_CACHE_TTL default 5 s)
+    or `redis` (shared, on AUTH_REDIS_URL, needs the `redis` package,
+    AUTH_SESSION_CACHE_TTL default 300 s); the memory store holds
+    AUTH_SESSION_CACHE_SIZE sessions
+    """
+    kind = getenv("AUTH_SESSION_STORE", "none")
+    if kind == "redis":
+        import redis
+        url = getenv("AUTH_REDIS_URL", "redis://localhost:6379/0")
+        ttl = float(getenv("AUTH_SESSION_CACHE_TTL", "300"))
+        return RedisSessionStore(redis.Redis.from_url(url), ttl=ttl)
+    if kind == "memory":
+        ttl = float(getenv("AUTH_SESSION_CACHE_TTL", "5"))
+        max_size = int(getenv("AUTH_SESSION_CACHE_SIZE", "10000"))
+        return MemorySessionStore(max_size=max_size, ttl=ttl)
+    return NullSessionStore()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+""" Session sweeper module
+"""
+from db import DB
+from os import getenv
+from threading import Event, Lock, Thread
+from time import perf_counter
+
+
+class SessionSweeper:
+    """ Background thread deleting the expired rows of the sessions table
+
+    Every `interval` seconds, the expired sessions are deleted by batches
+    (DB.delete_expired_sessions), each batch in its own short transaction.
+    """
+
+    def __init__(self, db: DB, interval: float = None,
+                 batch_size: int = None) -> None:
+        """ Initialize a new SessionSweeper
+
+        Args:
+            db (DB): database holding the sessions
+            interval (float): seconds between sweeps, defaults to
+                AUTH_SESSION_SWEEP_INTERVAL or 60
+            batch_size (int): rows deleted per transaction, defaults to
+                AUTH_SESSION_SWEEP_BATCH
+        """
+        if interval is None:
+            interval = float(getenv("AUTH_SESSION_SWEEP_INTERVAL", "60"))
+        self._db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = Event()
+        self._thread = None
+        self._lock = Lock()
+        self._stats = {"sweeps": 0, "deleted": 0, "errors": 0,
+                       "last_seconds": 0.0}
+
+    def start(self) -> None:
+        """ Start the sweeping thread
+        """
+        if self._thread is None:
+            self._thread = Thread(target=self._run, daemon=True,
+                                  name="session-sweeper")
+            self._thread.start()
+
+    def stop(self) -> None:
+        """ Stop the sweeping thread, after the running sweep if any
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def sweep(self) -> int:
+        """ Delete the expired sessions now
+
+        Returns:
+            int: number of sessions deleted
+        """
+        start = perf_counter()
+        try:
+            deleted = self._db.delete_expired_sessions(
+                batch_size=self.batch_size)
+        finally:
+            self._db.remove_session()
+        with self._lock:
+            self._stats["sweeps"] += 1
+            self._stats["deleted"] += deleted
+            self._stats["last_seconds"] = perf_counter() - start
+        return deleted
+
+    def _run(self) -> None:
+        """ Sweeping thread
+        """
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                with self._lock:
+                    self._stats["errors"] += 1
+
+    def stats(self) -> dict:
+        """ Sweeps done, sessions deleted, errors and duration of the last
+        sweep
+        """
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+""" Session token module
+"""
+from os import getenv
+from typing import Union
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+import warnings
+
+
+def _b64encode(data: bytes) -> str:
+    """ URL-safe base64 without padding
+    """
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    """ Inverse of `_b64encode`
+    """
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class SessionTokens:
+    """ Stateless session tokens: `<payload>.<signature>`, both URL-safe
+    base64, the signature being the HMAC-SHA256 of the payload
+
+    The payload holds the user `id`, `email`, session `generation` and
+    expiry time `exp`. A token is valid until it expires, or until the
+    generation of its user is incremented (revocation).
+    """
+
+    def __init__(self, secret: Union[bytes, str] = None,
+                 ttl: float = 86400) -> None:
+        """ Initialize a new SessionTokens
+
+        Args:
+            secret: signing key; a random one (tokens invalid after a
+                restart) if None
+            ttl (float): lifetime of a token in seconds
+        """
+        if secret is None:
+            secret = secrets.token_bytes(32)
+        if isinstance(secret, str):
+            secret = secret.encode("utf-8")
+        self._secret = secret
+        self.ttl = ttl
+
+    def _sign(self, payload: str) -> str:
+        """ Signature of an encoded payload
+        """
+        return _b64encode(hmac.new(self._secret, payload.encode("ascii"),
+                                   hashlib.sha256).digest())
+
+    def issue(self, user_id: int, email: str, generation: int) -> str:
+        """ New token of a user
+
+        Returns:
+            str: the token
+        """
+        payload = _b64encode(json.dumps(
+            {"id": user_id, "email": email, "generation": generation,
+             "exp": int(time.time() + self.ttl)},
+            separators=(",", ":")).encode("utf-8"))
+        return "{}.{}".format(payload, self._sign(payload))
+
+    def verify(self, token: str) -> Union[dict, None]:
+        """ Payload of a token with a valid signature, not expired
+
+        Returns:
+            the payload (`id`, `email`, `generation`, `exp`) or None
+        """
+        payload, _, signature = token.partition(".")
+        try:
+            if not hmac.compare_digest(self._sign(payload), signature):
+                return None
+            claims = json.loads(_b64decode(payload))
+        except (TypeError, ValueError):
+            return None
+        if claims.get("exp", 0) < time.time():
+            return None
+        return claims
+
+
+def create_session_tokens() -> SessionTokens:
+    """ SessionTokens signed with AUTH_SESSION_SECRET, valid for
+    AUTH_SESSION_TTL seconds (default one day)
+
+    Raises:
+        ValueError: AUTH_SESSION_SECRET is unset while WEB_CONCURRENCY
+            announces several workers, each of which would sign with its
+            own random key
+    """
+    secret = getenv("AUTH_SESSION_SECRET")
+    if not secret:
+        if int(getenv("WEB_CONCURRENCY", "1")) > 1:
+            raise ValueError("AUTH_SESSION_SECRET must be set when several "
+                             "workers serve signed sessions")
+        warnings.warn("AUTH_SESSION_SECRET is unset: session tokens are "
+                      "signed with a random key, valid in this process only")
+        secret = None
+    return SessionTokens(secret,
+                         ttl=float(getenv("AUTH_SESSION_TTL", "86400")))
@@ -2,7 +2,8 @@
 """ module for User class
 """
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Integer, String, Column
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
@@ -13,7 +14,23 @@ class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True)
-    email = Column(String(250), nullable=False)
+    email = Column(String(250), nullable=False, unique=True, index=True)
     hashed_password = Column(String(250), nullable=False)
-    session_id = Column(String(250))
-    reset_token = Column(String(250))
+    session_id = Column(String(250), unique=True, index=True)
+    reset_token = Column(String(250), unique=True, index=True)
+    session_generation = Column(Integer, nullable=False, default=0,
+                                server_default="0")
+
+
+class UserSession(Base):
+    """ Session of a user (session table mode): a user may hold several,
+    each one valid until `expires_at` (UTC)
+    """
+    __tablename__ = "sessions"
+
+    id = Column(Integer, primary_key=True)
+    token = Column(String(250), nullable=False, unique=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False,
+                     index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    user = relationship(User, lazy="joined")